@@ -1,9 +1,62 @@
 import os
+import json
+import functools
 import yaml
 from pathlib import Path
 from typing import Optional
 from pydantic_settings import BaseSettings
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+CONFIG_PATH = Path(__file__).parent.parent.parent / "config.yaml"
+
+# config.yaml key path -> Settings field
+_YAML_FIELDS = {
+    # Database configuration
+    ('database', 'neo4j', 'uri'): 'neo4j_uri',
+    ('database', 'neo4j', 'user'): 'neo4j_user',
+    ('database', 'neo4j', 'password'): 'neo4j_password',
+    ('database', 'neo4j', 'database'): 'neo4j_database',
+    ('database', 'neo4j', 'max_pool_size'): 'neo4j_max_pool_size',
+    ('database', 'neo4j', 'connection_acquisition_timeout'): 'neo4j_connection_acquisition_timeout',
+    ('database', 'neo4j', 'connection_timeout'): 'neo4j_connection_timeout',
+    # Retrieval configuration
+    ('retrieval', 'default_top_k'): 'default_top_k',
+    ('retrieval', 'vector_similarity_threshold'): 'vector_similarity_threshold',
+    ('retrieval', 'strategy_weights'): 'strategy_weights',
+    # Embedding configuration
+    ('embeddings', 'model'): 'embedding_model',
+    ('embeddings', 'dimension'): 'embedding_dimension',
+    ('embeddings', 'batch_size'): 'embedding_batch_size',
+    ('embeddings', 'cache_size'): 'embedding_cache_size',
+    ('embeddings', 'cache_path'): 'embedding_cache_path',
+    ('embeddings', 'quantization'): 'embedding_quantization',
+    # LLM configuration
+    ('llm', 'max_context_length'): 'max_context_length',
+    ('llm', 'temperature'): 'temperature',
+    ('llm', 'max_tokens'): 'max_tokens',
+    ('llm', 'cache_size'): 'response_cache_size',
+    ('llm', 'cache_ttl'): 'response_cache_ttl',
+    ('llm', 'cache_path'): 'response_cache_path',
+    # Logging configuration
+    ('logging', 'level'): 'log_level',
+    ('logging', 'format'): 'log_format',
+    ('logging', 'file'): 'log_file',
+    # Index configuration
+    ('indexes', 'vector', 'name'): 'vector_index_name',
+    ('indexes', 'vector', 'label'): 'vector_index_label',
+    ('indexes', 'vector', 'property'): 'vector_index_property',
+    ('indexes', 'vector', 'dimension'): 'vector_index_dimension',
+    ('indexes', 'fulltext', 'name'): 'fulltext_index_name',
+    ('indexes', 'fulltext', 'label'): 'fulltext_index_label',
+    ('indexes', 'fulltext', 'properties'): 'fulltext_index_properties',
+    ('indexes', 'allowed_labels'): 'allowed_labels',
+    ('indexes', 'allowed_properties'): 'allowed_properties',
+}
+
 class Settings(BaseSettings):
     """Application settings."""
     
@@ -12,6 +65,9 @@ class Settings(BaseSettings):
     neo4j_user: str = "neo4j"
     neo4j_password: str = "password"
     neo4j_database: str = "neo4j"
+    neo4j_max_pool_size: int = 100
+    neo4j_connection_acquisition_timeout: float = 60.0
+    neo4j_connection_timeout: float = 30.0
     
     # OpenAI Configuration
     openai_api_key: Optional[str] = None
@@ -25,11 +81,17 @@ class Settings(BaseSettings):
     embedding_model: str = "text-embedding-ada-002"
     embedding_dimension: int = 1536
     embedding_batch_size: int = 100
+    embedding_cache_size: int = 10000
+    embedding_cache_path: Optional[str] = None
+    embedding_quantization: str = "fp32"
     
     # LLM Configuration
     max_context_length: int = 4000
     temperature: float = 0.7
     max_tokens: int = 500
+    response_cache_size: int = 1000
+    response_cache_ttl: int = 86400
+    response_cache_path: Optional[str] = None
     
     # Logging Configuration
     log_level: str = "INFO"
@@ -44,88 +106,91 @@ class Settings(BaseSettings):
     fulltext_index_name: str = "documentFulltextIndex"
     fulltext_index_label: str = "Document"
     fulltext_index_properties: list = ["text"]
+    # Labels and properties that may be interpolated into Cypher
+    allowed_labels: list = ["Document"]
+    allowed_properties: list = ["text", "title", "source", "embedding"]
     
     class Config:
         env_file = ".env"
         case_sensitive = False
         extra = "allow"
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self._load_yaml_config()
+    @classmethod
+    def from_yaml(cls, config_path: Path = CONFIG_PATH) -> "Settings":
+        """Build settings from defaults, the environment and config.yaml.
+        
+        Values present in config.yaml take precedence over the environment.
+        """
+        return cls(**cls._load_yaml_config(config_path))
     
-    def _load_yaml_config(self):
-        """Load configuration from config.yaml file."""
-        config_path = Path(__file__).parent.parent.parent / "config.yaml"
+    @staticmethod
+    def _read_config_file(config_path: Path):
+        """Read config.yaml, reusing a JSON sidecar when it is up to date."""
+        cache_path = config_path.with_suffix('.yaml.json')
         
-        if config_path.exists():
+        try:
+            if os.path.getmtime(cache_path) >= os.path.getmtime(config_path):
+                with open(cache_path, 'r') as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        with open(config_path, 'r') as f:
+            config_data = yaml.load(f, Loader=_Loader)
+        
+        # Write the sidecar atomically; failing to cache is not an error
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(config_data, f)
+            os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError):
             try:
-                with open(config_path, 'r') as f:
-                    config_data = yaml.safe_load(f)
-                
-                if config_data:
-                    # Load database configuration
-                    if 'database' in config_data and 'neo4j' in config_data['database']:
-                        neo4j_config = config_data['database']['neo4j']
-                        self.neo4j_uri = neo4j_config.get('uri', self.neo4j_uri)
-                        self.neo4j_user = neo4j_config.get('user', self.neo4j_user)
-                        self.neo4j_password = neo4j_config.get('password', self.neo4j_password)
-                        self.neo4j_database = neo4j_config.get('database', self.neo4j_database)
-                    
-                    # Load retrieval configuration
-                    if 'retrieval' in config_data:
-                        retrieval_config = config_data['retrieval']
-                        self.default_top_k = retrieval_config.get('default_top_k', self.default_top_k)
-                        self.vector_similarity_threshold = retrieval_config.get('vector_similarity_threshold', self.vector_similarity_threshold)
-                        if 'strategy_weights' in retrieval_config:
-                            self.strategy_weights = retrieval_config['strategy_weights']
-                    
-                    # Load embedding configuration
-                    if 'embeddings' in config_data:
-                        embedding_config = config_data['embeddings']
-                        self.embedding_model = embedding_config.get('model', self.embedding_model)
-                        self.embedding_dimension = embedding_config.get('dimension', self.embedding_dimension)
-                        self.embedding_batch_size = embedding_config.get('batch_size', self.embedding_batch_size)
-                    
-                    # Load LLM configuration
-                    if 'llm' in config_data:
-                        llm_config = config_data['llm']
-                        self.max_context_length = llm_config.get('max_context_length', self.max_context_length)
-                        self.temperature = llm_config.get('temperature', self.temperature)
-                        self.max_tokens = llm_config.get('max_tokens', self.max_tokens)
-                    
-                    # Load logging configuration
-                    if 'logging' in config_data:
-                        logging_config = config_data['logging']
-                        self.log_level = logging_config.get('level', self.log_level)
-                        self.log_format = logging_config.get('format', self.log_format)
-                        self.log_file = logging_config.get('file', self.log_file)
-                    
-                    # Load index configuration
-                    if 'indexes' in config_data:
-                        if 'vector' in config_data['indexes']:
-                            vector_config = config_data['indexes']['vector']
-                            self.vector_index_name = vector_config.get('name', self.vector_index_name)
-                            self.vector_index_label = vector_config.get('label', self.vector_index_label)
-                            self.vector_index_property = vector_config.get('property', self.vector_index_property)
-                            self.vector_index_dimension = vector_config.get('dimension', self.vector_index_dimension)
-                        
-                        if 'fulltext' in config_data['indexes']:
-                            fulltext_config = config_data['indexes']['fulltext']
-                            self.fulltext_index_name = fulltext_config.get('name', self.fulltext_index_name)
-                            self.fulltext_index_label = fulltext_config.get('label', self.fulltext_index_label)
-                            self.fulltext_index_properties = fulltext_config.get('properties', self.fulltext_index_properties)
-                
-            except Exception as e:
-                print(f"Warning: Could not load config.yaml: {e}")
-                print("Using default configuration values")
-        else:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        
+        return config_data
+    
+    @classmethod
+    def _load_yaml_config(cls, config_path: Path) -> dict:
+        """Load config.yaml into a flat dict of field overrides."""
+        if not config_path.exists():
             print(f"Warning: config.yaml not found at {config_path}")
             print("Using default configuration values")
+            return {}
+        
+        try:
+            config_data = _load_yaml_cached(str(config_path), os.path.getmtime(config_path))
+            overrides = {}
+            for path, field in _YAML_FIELDS.items():
+                section = config_data or {}
+                for key in path[:-1]:
+                    section = section.get(key) or {}
+                if path[-1] in section:
+                    overrides[field] = section[path[-1]]
+            return overrides
+        except Exception as e:
+            print(f"Warning: Could not load config.yaml: {e}")
+            print("Using default configuration values")
+            return {}
 
+@functools.lru_cache(maxsize=8)
+def _load_yaml_cached(path: str, mtime: float):
+    """Parsed config file, reused until the file's mtime changes. Do not mutate."""
+    return Settings._read_config_file(Path(path))
+
+@functools.lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Get application settings."""
-    return Settings()
+    """Get application settings (parsed once per process)."""
+    return Settings.from_yaml()
+
+def invalidate_settings():
+    """Drop the cached settings so the next get_settings() call reloads them.
+    
+    Needed after changing environment variables, e.g. in tests.
+    """
+    get_settings.cache_clear()
 
-# Global settings instance
+# Global settings instance (same object as get_settings() returns)
 settings = get_settings()
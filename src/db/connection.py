@@ -1,5 +1,5 @@
-from neo4j import GraphDatabase
 from config.settings import get_settings
+from db.driver import get_driver
 
 class Neo4jConnection:
     def __init__(self, uri=None, user=None, password=None):
@@ -7,16 +7,25 @@ class Neo4jConnection:
         self.uri = uri or settings.neo4j_uri
         self.user = user or settings.neo4j_user
         self.password = password or settings.neo4j_password
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+        self.driver = get_driver(self.uri, self.user, self.password)
 
     def close(self):
-        if self.driver:
-            self.driver.close()
+        # The driver is shared process-wide and closed at exit
+        self.driver = None
 
     def query(self, query, parameters=None, db=None):
+        """Run a query and return every record as a dict (fully materialized)."""
+        return list(self.query_stream(query, parameters, db))
+
+    def query_stream(self, query, parameters=None, db=None):
+        """Run a query and yield records as dicts while the driver streams them.
+
+        The session stays open until the generator is exhausted or closed.
+        """
         with self.driver.session(database=db) as session:
             result = session.run(query, parameters)
-            return [r.data() for r in result]
+            for record in result:
+                yield record.data()
 
 # Example usage
 if __name__ == "__main__":
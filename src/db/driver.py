@@ -0,0 +1,75 @@
+"""
+Shared Neo4j driver for the hybridRAG system.
+
+The Neo4j driver keeps its own connection pool, so the whole process should
+use one driver per (uri, auth) pair instead of one per component.
+"""
+
+import atexit
+import threading
+from itertools import islice
+from typing import Any, Dict, List, Tuple
+from neo4j import GraphDatabase, Driver, RoutingControl
+from config.settings import get_settings
+
+_drivers: Dict[Tuple[str, str, str], Driver] = {}
+_lock = threading.Lock()
+
+def get_driver(uri: str, user: str, password: str) -> Driver:
+    """Get the shared driver for the given URI and credentials."""
+    key = (uri, user, password)
+    driver = _drivers.get(key)
+    if driver is None:
+        with _lock:
+            driver = _drivers.get(key)
+            if driver is None:
+                settings = get_settings()
+                driver = GraphDatabase.driver(
+                    uri,
+                    auth=(user, password),
+                    max_connection_pool_size=settings.neo4j_max_pool_size,
+                    connection_acquisition_timeout=settings.neo4j_connection_acquisition_timeout,
+                    connection_timeout=settings.neo4j_connection_timeout
+                )
+                _drivers[key] = driver
+    return driver
+
+def close_drivers():
+    """Close every shared driver."""
+    with _lock:
+        for driver in _drivers.values():
+            driver.close()
+        _drivers.clear()
+
+def run_read(driver: Driver, database: str, cypher_query: str, **parameters) -> List[Tuple[Any, float]]:
+    """Run a read query returning (node, score) rows, reading at most $top_k of them.
+    
+    The session fetch size matches top_k so a search is one network frame,
+    and any rows beyond top_k are never pulled from the server.
+    """
+    limit = parameters["top_k"]
+    
+    def work(tx):
+        result = tx.run(cypher_query, parameters)
+        return [(record["node"], record["score"]) for record in islice(result, limit)]
+    
+    with driver.session(database=database, fetch_size=max(limit, 1)) as session:
+        return session.execute_read(work)
+
+def run_batch_read(driver: Driver, database: str, cypher_query: str, size: int,
+                   **parameters) -> List[List[Tuple[Any, float]]]:
+    """Run a batched read query and split its rows back into one (node, score) list per input.
+    
+    The query must return `i` (the input position) and `hits`, a list of
+    {node, score} maps; inputs without a row get an empty list.
+    """
+    records, _, _ = driver.execute_query(
+        cypher_query, parameters,
+        database_=database, routing_=RoutingControl.READ
+    )
+    results = [[] for _ in range(size)]
+    for record in records:
+        results[record["i"]] = [(hit["node"], hit["score"]) for hit in record["hits"]]
+    return results
+
+atexit.register(close_drivers)
@@ -1,6 +1,40 @@
 import os
-from neo4j import GraphDatabase
+import re
 from config.settings import get_settings
+from db.driver import get_driver
+
+# Tokens that can contain a ';' without ending a statement, plus the terminator itself
+_CYPHER_TOKEN = re.compile(r"""
+    '(?:[^'\\]|\\.)*'    # single-quoted string
+  | "(?:[^"\\]|\\.)*"    # double-quoted string
+  | `[^`]*`              # quoted identifier
+  | /\*.*?\*/            # block comment
+  | //[^\n]*             # line comment
+  | ;                    # statement terminator
+""", re.VERBOSE | re.DOTALL)
+
+def split_cypher_statements(script):
+    """Split a Cypher script into statements, ignoring ';' in strings and comments."""
+    statements = []
+    current = []
+    position = 0
+    
+    for match in _CYPHER_TOKEN.finditer(script):
+        current.append(script[position:match.start()])
+        token = match.group()
+        if token == ";":
+            statements.append("".join(current))
+            current = []
+        elif token.startswith(("//", "/*")):
+            current.append(" ")
+        else:
+            current.append(token)
+        position = match.end()
+    
+    current.append(script[position:])
+    statements.append("".join(current))
+    
+    return [statement.strip() for statement in statements if statement.strip()]
 
 class Neo4jIngestor:
     # Paths to Cypher scripts
@@ -8,52 +42,60 @@ class Neo4jIngestor:
     INDEX_SCRIPT_PATH = os.path.join("db", "create_indexes.cypher")
     LOAD_SCRIPT_PATH = os.path.join("db", "load_data.cypher")
 
+    # Statements per transaction when loading data
+    LOAD_BATCH_SIZE = 500
+
     def __init__(self, uri=None, user=None, password=None):
         settings = get_settings()
         self.uri = uri or settings.neo4j_uri
         self.user = user or settings.neo4j_user
         self.password = password or settings.neo4j_password
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+        self.driver = get_driver(self.uri, self.user, self.password)
 
     def close(self):
-        if self.driver:
-            self.driver.close()
+        # The driver is shared process-wide and closed at exit
+        self.driver = None
 
-    def run_cypher_file(self, session, file_path):
+    def run_cypher_file(self, session, file_path, batch_size=None):
+        """Execute every statement in a Cypher script.
+        
+        Without batch_size each statement runs in its own auto-commit
+        transaction. With batch_size, statements are grouped into explicit
+        transactions committed every batch_size statements.
+        """
         with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            
-            # Process lines to build commands
-            current_command = ""
-            for line in lines:
-                line = line.strip()
-                
-                # Skip empty lines and pure comment lines
-                if not line or line.startswith("//") or line.startswith("--"):
-                    continue
-                
-                # Add line to current command
-                current_command += line + " "
-                
-                # If line ends with semicolon, execute the command
-                if line.endswith(";"):
-                    command = current_command.strip()
-                    if command:
-                        try:
-                            result = session.run(command)
-                            print(f"Executed: {command[:50]}...")
-                            # Print summary if available
-                            if hasattr(result, 'consume'):
-                                summary = result.consume()
-                                if summary.counters.indexes_added > 0:
-                                    print(f"  -> Created {summary.counters.indexes_added} indexes")
-                        except Exception as e:
-                            print(f"Error executing: {command[:50]}...")
-                            print(f"  Error: {e}")
-                            # Continue with other commands instead of failing completely
-                    
-                    # Reset for next command
-                    current_command = ""
+            statements = split_cypher_statements(f.read())
+        
+        if not batch_size:
+            for command in statements:
+                self._run_statement(session, command)
+            return
+        
+        for start in range(0, len(statements), batch_size):
+            batch = statements[start:start + batch_size]
+            try:
+                with session.begin_transaction() as tx:
+                    for command in batch:
+                        tx.run(command).consume()
+                    tx.commit()
+                print(f"Executed {len(batch)} statements in one transaction")
+            except Exception as e:
+                # Replay the failed batch one statement at a time so the good ones still land
+                print(f"Batch of {len(batch)} statements failed ({e}); retrying individually")
+                for command in batch:
+                    self._run_statement(session, command)
+    
+    def _run_statement(self, session, command):
+        """Run a single statement, reporting (not raising) failures."""
+        try:
+            summary = session.run(command).consume()
+            print(f"Executed: {command[:50]}...")
+            if summary.counters.indexes_added > 0:
+                print(f"  -> Created {summary.counters.indexes_added} indexes")
+        except Exception as e:
+            print(f"Error executing: {command[:50]}...")
+            print(f"  Error: {e}")
+            # Continue with other commands instead of failing completely
 
     def ingest(self):
         with self.driver.session() as session:
@@ -64,7 +106,7 @@ class Neo4jIngestor:
             self.run_cypher_file(session, self.INDEX_SCRIPT_PATH)
 
             print("Loading data...")
-            self.run_cypher_file(session, self.LOAD_SCRIPT_PATH)
+            self.run_cypher_file(session, self.LOAD_SCRIPT_PATH, batch_size=self.LOAD_BATCH_SIZE)
 
         print("Data ingestion complete.")
 
@@ -1,20 +1,64 @@
-import numpy as np
-from typing import List, Union
-from openai import OpenAI
+import atexit
+import functools
+import hashlib
+import os
+import threading
+from typing import List, Optional, Union
+from cachetools import LRUCache
 from config.settings import get_settings
+from embeddings.utils import (
+    CandidateIndex, cosine_similarity, int8_cosine, load_embeddings, quantize_int8, save_embeddings
+)
 
 class EmbeddingGenerator:
-    """Generate embeddings for text using various models."""
+    """Generate embeddings for text using various models.
     
-    def __init__(self, model_name: str = "text-embedding-ada-002"):
-        """Initialize the embedding generator."""
+    Embeddings are computed remotely by the OpenAI embeddings API, so the
+    per-call cost is the request rather than a local forward pass: batch with
+    generate_embeddings and rely on the cache. Without an API key,
+    deterministic random vectors are returned for testing.
+    """
+    
+    # embedding_quantization setting -> in-memory dtype
+    QUANTIZATION_DTYPES = {"fp32": "float32", "fp16": "float16", "int8": "int8"}
+    
+    def __init__(self, model_name: str = "text-embedding-ada-002", dtype=None):
+        """Initialize the embedding generator.
+        
+        dtype is the storage precision (float32, float16 or int8) used by
+        build_index and cosine_similarity; it defaults to the
+        embedding_quantization setting. It is kept as a dtype name, so numpy
+        is only imported by the paths that build arrays.
+        """
         self.model_name = model_name
         self.settings = get_settings()
+        if dtype is None:
+            quantization = self.settings.embedding_quantization
+            if quantization not in self.QUANTIZATION_DTYPES:
+                raise ValueError(f"Unknown embedding_quantization: {quantization!r}")
+            dtype = self.QUANTIZATION_DTYPES[quantization]
+        # str() also accepts a numpy dtype object
+        dtype = str(dtype)
+        if dtype not in self.QUANTIZATION_DTYPES.values():
+            raise ValueError(f"Unsupported embedding dtype: {dtype!r}")
+        self.dtype = dtype
         
         if self.settings.openai_api_key:
-            self.client = OpenAI(api_key=self.settings.openai_api_key)
+            # Imported here so users without an API key never pay for the openai import
+            from openai import OpenAI
+            from utils.http import get_http_client
+            self.client = OpenAI(api_key=self.settings.openai_api_key, http_client=get_http_client())
         else:
             self.client = None
+        
+        # In-memory cache of API embeddings by text digest, optionally persisted to disk
+        self._cache = LRUCache(maxsize=self.settings.embedding_cache_size)
+        self._cache_lock = threading.Lock()
+        self._cache_path = self.settings.embedding_cache_path
+        if self._cache_path:
+            if os.path.exists(self._cache_path):
+                self._cache.update(load_embeddings(self._cache_path))
+            atexit.register(self.save_cache)
     
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text."""
@@ -22,37 +66,107 @@ class EmbeddingGenerator:
             # Fallback to random embedding for testing
             return self._generate_random_embedding(text)
         
+        cached = self._cache_get(text)
+        if cached is not None:
+            return cached
+        
         try:
             response = self.client.embeddings.create(
                 input=text,
                 model=self.model_name
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
         except Exception as e:
             print(f"Error generating OpenAI embedding: {e}")
             return self._generate_random_embedding(text)
+        
+        self._cache_put(text, embedding)
+        return embedding
     
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts."""
-        return [self.generate_embedding(text) for text in texts]
+        """Generate embeddings for multiple texts, one API request per batch of uncached texts."""
+        if not self.client:
+            return [self._generate_random_embedding(text) for text in texts]
+        
+        embeddings = [self._cache_get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        
+        fetched = {}
+        batch_size = max(1, self.settings.embedding_batch_size)
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            try:
+                response = self.client.embeddings.create(
+                    input=batch,
+                    model=self.model_name
+                )
+                for text, item in zip(batch, sorted(response.data, key=lambda d: d.index)):
+                    fetched[text] = item.embedding
+                    self._cache_put(text, item.embedding)
+            except Exception as e:
+                print(f"Error generating OpenAI embeddings: {e}")
+                for text in batch:
+                    fetched[text] = self._generate_random_embedding(text)
+        
+        return [
+            embedding if embedding is not None else list(fetched[text])
+            for text, embedding in zip(texts, embeddings)
+        ]
+    
+    def save_cache(self):
+        """Write the embedding cache to embedding_cache_path, if configured."""
+        if not self._cache_path:
+            return
+        with self._cache_lock:
+            snapshot = dict(self._cache)
+        directory = os.path.dirname(self._cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        save_embeddings(snapshot, self._cache_path)
+    
+    def _cache_get(self, text: str) -> Optional[List[float]]:
+        """Return a copy of the cached embedding for text, or None."""
+        with self._cache_lock:
+            embedding = self._cache.get(_cache_key(self.model_name, text))
+        return list(embedding) if embedding is not None else None
+    
+    def _cache_put(self, text: str, embedding: List[float]):
+        with self._cache_lock:
+            self._cache[_cache_key(self.model_name, text)] = list(embedding)
+    
+    def build_index(self, texts: List[str]) -> CandidateIndex:
+        """Embed texts and store them in a CandidateIndex at this generator's dtype."""
+        return CandidateIndex.from_embeddings(self.generate_embeddings(texts), dtype=self.dtype)
     
     def _generate_random_embedding(self, text: str, dimension: int = 1536) -> List[float]:
         """Generate a random embedding for testing purposes."""
-        # Use text hash as seed for reproducible random embeddings
-        seed = hash(text) % (2**32)
-        np.random.seed(seed)
-        return np.random.normal(0, 1, dimension).tolist()
+        import numpy as np
+        
+        # Use a stable text hash as seed so embeddings match across processes
+        seed = _stable_seed(text)
+        # Local generator: no shared global RNG state between threads
+        rng = np.random.default_rng(seed)
+        return rng.standard_normal(dimension, dtype=np.float32).tolist()
     
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        vec1 = np.array(vec1)
-        vec2 = np.array(vec2)
-        
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        
-        return dot_product / (norm1 * norm2)
+        """Calculate cosine similarity between two vectors at this generator's dtype."""
+        if self.dtype == "int8":
+            return int8_cosine(*quantize_int8(vec1), *quantize_int8(vec2))
+        return cosine_similarity(vec1, vec2, dtype=self.dtype)
+
+@functools.lru_cache(maxsize=1)
+def get_embedding_generator() -> EmbeddingGenerator:
+    """Get the process-wide EmbeddingGenerator, so its client and cache are shared."""
+    return EmbeddingGenerator()
+
+def _stable_seed(text: str) -> int:
+    """32-bit seed derived from text, the same in every process and environment."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=4).digest(), 'little')
+
+def _cache_key(model_name: str, text: str) -> str:
+    """Fixed-size cache key for text, so long documents don't bloat the cache.
+    
+    The model name is part of the key so a persisted cache is never reused
+    for a different embedding model.
+    """
+    return hashlib.blake2b(f"{model_name}\0{text}".encode('utf-8'), digest_size=16).hexdigest()
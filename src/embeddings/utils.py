@@ -1,14 +1,33 @@
-import numpy as np
-from typing import List, Tuple, Dict, Any
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Tuple, Dict, Any, Optional
 import json
 
-def normalize_vector(vector: List[float]) -> List[float]:
-    """Normalize a vector to unit length."""
-    vector = np.array(vector)
-    norm = np.linalg.norm(vector)
-    if norm == 0:
-        return vector.tolist()
-    return (vector / norm).tolist()
+if TYPE_CHECKING:
+    import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+def normalize_vector(vector: List[float], as_list: bool = False):
+    """Normalize a vector to unit length.
+    
+    Returns a float32 ndarray, or a list when as_list is True.
+    """
+    import numpy as np
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    if norm != 0:
+        arr = arr * (1.0 / norm)
+    return arr.tolist() if as_list else arr
 
 def batch_embeddings(embeddings: List[List[float]], batch_size: int = 100) -> List[List[List[float]]]:
     """Split embeddings into batches."""
@@ -16,29 +35,52 @@ def batch_embeddings(embeddings: List[List[float]], batch_size: int = 100) -> Li
 
 def save_embeddings(embeddings: Dict[str, List[float]], filepath: str):
     """Save embeddings to a JSON file."""
-    with open(filepath, 'w') as f:
-        json.dump(embeddings, f, indent=2)
+    if orjson is not None:
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(embeddings, option=orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(filepath, 'w') as f:
+            json.dump(embeddings, f)
 
 def load_embeddings(filepath: str) -> Dict[str, List[float]]:
     """Load embeddings from a JSON file."""
+    if orjson is not None:
+        with open(filepath, 'rb') as f:
+            return orjson.loads(f.read())
     with open(filepath, 'r') as f:
         return json.load(f)
 
+def save_embeddings_npz(filepath: str, keys: List[str], matrix: np.ndarray):
+    """Save embeddings as a compressed float16 matrix with one key per row."""
+    import numpy as np
+    matrix = np.asarray(matrix)
+    if len(keys) != len(matrix):
+        raise ValueError(f"Got {len(keys)} keys for {len(matrix)} embeddings")
+    np.savez_compressed(filepath, keys=np.array(keys, dtype=str), matrix=matrix.astype(np.float16))
+
+def load_embeddings_npz(filepath: str) -> Tuple[List[str], np.ndarray]:
+    """Load (keys, float16 matrix) written by save_embeddings_npz."""
+    import numpy as np
+    with np.load(filepath, allow_pickle=False) as data:
+        return data['keys'].tolist(), data['matrix']
+
 def compute_embedding_statistics(embeddings: List[List[float]]) -> Dict[str, float]:
     """Compute statistics for a collection of embeddings."""
+    import numpy as np
     if not embeddings:
         return {}
     
-    # Convert to numpy array for efficient computation
-    embeddings_array = np.array(embeddings)
+    # Convert to numpy array and compute every row norm in one pass
+    embeddings_array = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings_array, axis=1)
     
     stats = {
         'count': len(embeddings),
         'dimension': embeddings_array.shape[1] if embeddings_array.size > 0 else 0,
-        'mean_norm': float(np.mean([np.linalg.norm(emb) for emb in embeddings_array])),
-        'std_norm': float(np.std([np.linalg.norm(emb) for emb in embeddings_array])),
-        'min_norm': float(np.min([np.linalg.norm(emb) for emb in embeddings_array])),
-        'max_norm': float(np.max([np.linalg.norm(emb) for emb in embeddings_array]))
+        'mean_norm': float(norms.mean()),
+        'std_norm': float(norms.std()),
+        'min_norm': float(norms.min()),
+        'max_norm': float(norms.max())
     }
     
     return stats
@@ -50,21 +92,155 @@ def find_similar_embeddings(
     threshold: float = 0.0
 ) -> List[Tuple[int, float]]:
     """Find most similar embeddings to a query embedding."""
-    similarities = []
+    import numpy as np
+    if len(candidate_embeddings) == 0 or top_k <= 0:
+        return []
+    
+    # Score every candidate with a single matrix-vector product
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    similarities = (candidates @ query) / (np.linalg.norm(candidates, axis=1) * np.linalg.norm(query) + 1e-12)
     
-    for i, candidate in enumerate(candidate_embeddings):
-        similarity = cosine_similarity(query_embedding, candidate)
-        if similarity >= threshold:
-            similarities.append((i, similarity))
+    return _top_k_above(similarities, top_k, threshold)
+
+def _top_k_above(similarities: np.ndarray, top_k: int, threshold: float) -> List[Tuple[int, float]]:
+    """Return the top_k (index, similarity) pairs at or above threshold, best first."""
+    import numpy as np
+    indices = np.flatnonzero(similarities >= threshold)
+    if len(indices) > top_k:
+        # Select the top_k in O(N), then sort only those
+        indices = indices[np.argpartition(-similarities[indices], top_k - 1)[:top_k]]
+    indices = indices[np.argsort(-similarities[indices], kind='stable')]
     
-    # Sort by similarity (descending) and return top_k
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    return similarities[:top_k]
+    return [(int(i), float(similarities[i])) for i in indices]
 
-def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    vec1 = np.array(vec1)
-    vec2 = np.array(vec2)
+@dataclass
+class CandidateIndex:
+    """Candidate embeddings stored as unit-length rows for repeated similarity search.
+    
+    Rows can be kept as float32, float16 (half the memory) or int8 with a
+    per-row scale (a quarter of the memory). float16 and int8 rows are
+    scored with simsimd's native kernels when it is installed; without it
+    they are widened to float32 SCORE_CHUNK rows at a time, which is slower
+    than a float32 index, so the smaller dtypes then only save memory.
+    """
+    
+    # Rows widened to float32 at a time when scoring float16/int8 without simsimd
+    SCORE_CHUNK = 4096
+    
+    matrix: np.ndarray  # (N, D) unit-length rows as float32, float16 or int8
+    norms: np.ndarray  # (N,) float32, original L2 norm of each row
+    scale: Optional[np.ndarray] = None  # (N,) float32 dequantization scale, int8 only
+    
+    @classmethod
+    def from_embeddings(cls, embeddings: List[List[float]], dtype="float32") -> "CandidateIndex":
+        """Build an index, normalizing (and optionally quantizing) every candidate once."""
+        import numpy as np
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float16, np.int8):
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+        
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1)
+        safe_norms = np.where(norms == 0, 1.0, norms).astype(np.float32)
+        matrix = matrix / safe_norms[:, None]
+        
+        if dtype == np.int8:
+            quantized, scale = _quantize_rows(matrix)
+            return cls(matrix=quantized, norms=norms, scale=scale)
+        return cls(matrix=matrix.astype(dtype, copy=False), norms=norms)
+    
+    def __len__(self) -> int:
+        return len(self.matrix)
+    
+    def find_similar(self, query_embedding: List[float], top_k: int = 5,
+                     threshold: float = 0.0) -> List[Tuple[int, float]]:
+        """Find the candidates most similar to a query embedding."""
+        import numpy as np
+        if len(self.matrix) == 0 or top_k <= 0:
+            return []
+        
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            similarities = np.zeros(len(self.matrix), dtype=np.float32)
+        elif self.scale is not None:
+            query_int8, query_scale = _quantize_rows((query / query_norm)[None, :])
+            similarities = self._dots(query_int8[0], query_scale[0]) * self.scale
+        else:
+            similarities = self._dots((query / query_norm).astype(self.matrix.dtype), 1.0)
+        
+        return _top_k_above(similarities, top_k, threshold)
+    
+    def _dots(self, query: np.ndarray, query_scale: float) -> np.ndarray:
+        """Dot product of every row with query (same dtype as the rows), as float32."""
+        import numpy as np
+        if self.matrix.dtype == np.float32:
+            return self.matrix @ (query * np.float32(query_scale))
+        if simsimd is not None:
+            dots = np.asarray(simsimd.cdist(query[None, :], self.matrix, metric="dot"))[0]
+            return (dots * query_scale).astype(np.float32)
+        # numpy has no fast float16 or int8 matmul
+        query = query.astype(np.float32) * np.float32(query_scale)
+        dots = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), self.SCORE_CHUNK):
+            rows = self.matrix[start:start + self.SCORE_CHUNK].astype(np.float32)
+            dots[start:start + self.SCORE_CHUNK] = rows @ query
+        return dots
+
+def _quantize_rows(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (int8 rows, float32 scales)."""
+    import numpy as np
+    max_abs = np.abs(matrix).max(axis=1) if matrix.size else np.zeros(len(matrix), dtype=np.float32)
+    scale = (np.where(max_abs == 0, 1.0, max_abs) / 127.0).astype(np.float32)
+    quantized = np.clip(np.rint(matrix / scale[:, None]), -127, 127).astype(np.int8)
+    return quantized, scale
+
+def quantize_int8(vector: List[float]) -> Tuple[np.ndarray, float]:
+    """Normalize a vector to unit length and quantize it to int8 with a symmetric scale.
+    
+    Returns (int8 vector, scale); vector / norm ~= int8 vector * scale.
+    """
+    import numpy as np
+    normalized = normalize_vector(vector)
+    quantized, scale = _quantize_rows(normalized[None, :])
+    return quantized[0], float(scale[0])
+
+def int8_cosine(vec1: np.ndarray, scale1: float, vec2: np.ndarray, scale2: float) -> float:
+    """Approximate cosine similarity of two vectors quantized by quantize_int8."""
+    import numpy as np
+    if simsimd is not None:
+        dot = float(simsimd.dot(vec1, vec2))
+    else:
+        dot = int(np.dot(vec1.astype(np.int32), vec2.astype(np.int32)))
+    return dot * scale1 * scale2
+
+def cosine_similarity(vec1: List[float], vec2: List[float], dtype="float32") -> float:
+    """Calculate cosine similarity between two vectors (0.0 if either is all zeros).
+    
+    dtype is float32 or float16; with float16 the inputs are rounded to half
+    precision first, which simsimd scores with its native f16 kernels.
+    """
+    import numpy as np
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float16):
+        raise ValueError(f"Unsupported cosine dtype: {dtype}")
+    if simsimd is not None:
+        vec1 = np.asarray(vec1, dtype=dtype)
+        vec2 = np.asarray(vec2, dtype=dtype)
+        if not vec1.any() or not vec2.any():
+            return 0.0
+        return 1.0 - float(simsimd.cosine(vec1, vec2))
+    
+    if dtype == np.float16:
+        # numpy has no fast half-precision dot, so accumulate the rounded values in float32
+        vec1 = np.asarray(vec1, dtype=np.float16).astype(np.float32)
+        vec2 = np.asarray(vec2, dtype=np.float16).astype(np.float32)
+    else:
+        vec1 = np.array(vec1)
+        vec2 = np.array(vec2)
     
     dot_product = np.dot(vec1, vec2)
     norm1 = np.linalg.norm(vec1)
@@ -1,21 +1,65 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+import atexit
+import functools
+import hashlib
+import io
+import os
+import pickle
+import textwrap
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from cachetools import LRUCache
 from config.settings import get_settings
 from retrieval.hybrid_retriever import HybridRetriever
-from embeddings.generator import EmbeddingGenerator
-from openai import OpenAI
+from embeddings.generator import get_embedding_generator
+from utils.http import get_http_client, new_async_http_client
+
+async def _close_at_loop_shutdown(client):
+    """Async generator that closes client when it is finalized by its event loop."""
+    try:
+        yield
+    finally:
+        await client.close()
 
 class LLMPipeline:
     """LLM pipeline that orchestrates retrieval and generation."""
     
+    # Upper bound on concurrent queries in batch_process
+    MAX_BATCH_WORKERS = 16
+    
+    # Chat model used for answers
+    CHAT_MODEL = "gpt-4o-mini"
+    
+    # Prompts are constant, so build them once
+    _SYSTEM_PROMPT = (
+        "You are a helpful AI assistant that answers questions based on the provided context. "
+        "Use only the information from the context to answer the question. If the context doesn't contain "
+        "enough information to answer the question, say so. Be concise but informative."
+    )
+    _SYSTEM_MSG = {"role": "system", "content": _SYSTEM_PROMPT}
+    _USER_PROMPT_TEMPLATE = textwrap.dedent("""\
+        Question: {query}
+
+        Context:
+        {context}
+
+        Please provide a clear and accurate answer based on the context above:""")
+    
     def __init__(self, uri: str = None, user: str = None, password: str = None):
         """Initialize the LLM pipeline."""
         settings = get_settings()
         self.uri = uri or settings.neo4j_uri
         self.user = user or settings.neo4j_user
         self.password = password or settings.neo4j_password
+        self.database = settings.neo4j_database
         
-        self.retriever = HybridRetriever(self.uri, self.user, self.password)
-        self.embedding_generator = EmbeddingGenerator()
+        # The retriever and the pipeline embed through the same shared generator
+        self.embedding_generator = get_embedding_generator()
+        self.retriever = HybridRetriever(self.uri, self.user, self.password,
+                                         embedding_generator=self.embedding_generator)
         
         # Pipeline configuration
         self.max_context_length = settings.max_context_length
@@ -24,50 +68,146 @@ class LLMPipeline:
         
         # Initialize OpenAI client if API key is available
         if settings.openai_api_key:
-            self.openai_client = OpenAI(api_key=settings.openai_api_key)
+            # Imported here so retrieval-only use never pays for the openai import
+            from openai import OpenAI
+            self.openai_client = OpenAI(api_key=settings.openai_api_key, http_client=get_http_client())
         else:
             self.openai_client = None
+        # aprocess_query's AsyncOpenAI clients, one per event loop since their connections are bound to it
+        self._async_openai_clients = weakref.WeakKeyDictionary()
+        
+        # Answers by request digest, optionally persisted to disk; set use_cache to False for fresh runs
+        self.use_cache = True
+        self._response_cache = LRUCache(maxsize=settings.response_cache_size)
+        self._response_cache_lock = threading.Lock()
+        self._response_cache_ttl = settings.response_cache_ttl
+        self._response_cache_path = settings.response_cache_path
+        self._cache_hits = 0
+        self._cache_misses = 0
+        if self._response_cache_path:
+            if os.path.exists(self._response_cache_path):
+                self._load_cache()
+            atexit.register(self.save_cache)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=1)
+    def get_shared(cls) -> "LLMPipeline":
+        """Get a process-wide pipeline for the configured database, closed at exit.
+        
+        Lets scripts reuse one driver pool, OpenAI client and result cache
+        instead of building a pipeline per run.
+        """
+        pipeline = cls()
+        atexit.register(pipeline.close)
+        return pipeline
     
     def close(self):
         self.retriever.close()
     
     def process_query(self, query: str, strategy: str = "hybrid", 
                      top_k: int = 5, include_explanation: bool = False) -> Dict[str, Any]:
-        """Process a query through the complete pipeline."""
+        """Process a query through the complete pipeline (answers are cached while use_cache is set)."""
+        key = self._response_key(query, strategy, top_k, include_explanation) if self.use_cache else None
+        if key is not None:
+            cached = self._cached_response(key)
+            if cached is not None:
+                return cached
+        
+        result = self._process_query(query, strategy, top_k, include_explanation)
+        if key is not None:
+            self._store_response(key, result)
+        return result
+    
+    def _process_query(self, query: str, strategy: str, top_k: int,
+                       include_explanation: bool = False) -> Dict[str, Any]:
+        """process_query without the response cache."""
         try:
             # Step 1: Retrieve relevant documents
             retrieved_docs = self.retriever.retrieve(query, top_k, strategy)
-            
+        except Exception as e:
+            return self._error_result(query, strategy, e)
+        
+        return self._answer(query, strategy, top_k, retrieved_docs, include_explanation)
+    
+    async def aprocess_query(self, query: str, strategy: str = "hybrid",
+                             top_k: int = 5, include_explanation: bool = False) -> Dict[str, Any]:
+        """Async process_query, so independent queries can be awaited together with asyncio.gather.
+        
+        Retrieval runs in a worker thread (the retriever already runs its
+        sub-searches concurrently) and the completion is awaited on
+        AsyncOpenAI, so one query's generation overlaps other queries' work.
+        """
+        key = self._response_key(query, strategy, top_k, include_explanation) if self.use_cache else None
+        if key is not None:
+            cached = self._cached_response(key)
+            if cached is not None:
+                return cached
+        
+        try:
+            retrieved_docs = await asyncio.to_thread(self.retriever.retrieve, query, top_k, strategy)
+        except Exception as e:
+            return self._error_result(query, strategy, e)
+        
+        try:
+            context = self._prepare_context(retrieved_docs)
+            response, fallback = await self._agenerate_response(query, context)
+            explanation = None
+            if include_explanation:
+                explanation = await asyncio.to_thread(self.retriever.explain_retrieval, query, top_k)
+            result = self._result(query, strategy, retrieved_docs, context, response, explanation, fallback)
+        except Exception as e:
+            return self._error_result(query, strategy, e)
+        
+        if key is not None:
+            self._store_response(key, result)
+        return result
+    
+    def _answer(self, query: str, strategy: str, top_k: int, retrieved_docs: List[tuple],
+                include_explanation: bool = False) -> Dict[str, Any]:
+        """Generate the answer for already retrieved documents."""
+        try:
             # Step 2: Prepare context from retrieved documents
             context = self._prepare_context(retrieved_docs)
             
             # Step 3: Generate response using LLM
-            response = self._generate_response(query, context)
+            response, fallback = self._generate_response(query, context)
             
             # Step 4: Prepare result
-            result = {
-                'query': query,
-                'strategy': strategy,
-                'retrieved_documents': len(retrieved_docs),
-                'response': response,
-                'context_length': len(context)
-            }
-            
-            if include_explanation:
-                result['explanation'] = self.retriever.explain_retrieval(query, top_k)
-            
-            return result
+            explanation = self.retriever.explain_retrieval(query, top_k) if include_explanation else None
+            return self._result(query, strategy, retrieved_docs, context, response, explanation, fallback)
             
         except Exception as e:
-            return {
-                'error': str(e),
-                'query': query,
-                'strategy': strategy
-            }
+            return self._error_result(query, strategy, e)
+    
+    @staticmethod
+    def _result(query: str, strategy: str, retrieved_docs: List[tuple], context: str, response: str,
+                explanation: Optional[Dict[str, Any]] = None, fallback: bool = False) -> Dict[str, Any]:
+        """Build a pipeline result; fallback marks a response not generated by the LLM."""
+        result = {
+            'query': query,
+            'strategy': strategy,
+            'retrieved_documents': len(retrieved_docs),
+            'response': response,
+            'context_length': len(context)
+        }
+        if explanation is not None:
+            result['explanation'] = explanation
+        if fallback:
+            result['fallback'] = True
+        return result
+    
+    @staticmethod
+    def _error_result(query: str, strategy: str, error: Exception) -> Dict[str, Any]:
+        return {
+            'error': str(error),
+            'query': query,
+            'strategy': strategy
+        }
     
     def _prepare_context(self, retrieved_docs: List[tuple]) -> str:
-        """Prepare context string from retrieved documents."""
-        context_parts = []
+        """Prepare context string from retrieved documents, truncated to max_context_length."""
+        buffer = io.StringIO()
+        total = 0
         
         for i, (node, score) in enumerate(retrieved_docs):
             # Extract text content from the node
@@ -80,64 +220,232 @@ class LLMPipeline:
             else:
                 text = str(node)
             
-            context_parts.append(f"Document {i+1} (Score: {score:.3f}):\n{text}\n")
-        
-        context = "\n".join(context_parts)
-        
-        # Truncate if too long
-        if len(context) > self.max_context_length:
-            context = context[:self.max_context_length] + "..."
+            part = f"Document {i+1} (Score: {score:.3f}):\n{text}\n"
+            if i > 0:
+                part = "\n" + part
+            
+            # Stop as soon as the limit is reached instead of truncating afterwards
+            remaining = self.max_context_length - total
+            if len(part) > remaining:
+                buffer.write(part[:remaining])
+                buffer.write("...")
+                break
+            
+            buffer.write(part)
+            total += len(part)
         
-        return context
+        return buffer.getvalue()
     
-    def _generate_response(self, query: str, context: str) -> str:
-        """Generate response using the context and an LLM."""
+    def _generate_response(self, query: str, context: str) -> Tuple[str, bool]:
+        """Generate response using the context and an LLM.
+        
+        Returns (response, fallback); fallback is True when the LLM was not
+        configured or failed and the response only echoes the context.
+        """
         if not self.openai_client:
             # Fallback response when OpenAI is not configured
-            return f"Based on the retrieved documents, here's what I found about '{query}':\n\n{context}\n\n[Note: OpenAI API key not configured. This is a fallback response.]"
+            return f"Based on the retrieved documents, here's what I found about '{query}':\n\n{context}\n\n[Note: OpenAI API key not configured. This is a fallback response.]", True
         
         try:
-            # Create system prompt for RAG
-            system_prompt = """You are a helpful AI assistant that answers questions based on the provided context. 
-            Use only the information from the context to answer the question. If the context doesn't contain 
-            enough information to answer the question, say so. Be concise but informative."""
+            # Call OpenAI API
+            response = self.openai_client.chat.completions.create(**self._completion_args(query, context))
             
-            # Create user prompt with context
-            user_prompt = f"""Question: {query}
-
-            Context:
-            {context}
-
-            Please provide a clear and accurate answer based on the context above:"""
+            return response.choices[0].message.content.strip(), False
             
-            # Call OpenAI API
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
+        except Exception as e:
+            # Fallback response on error
+            return f"Based on the retrieved documents, here's what I found about '{query}':\n\n{context}\n\n[Error generating LLM response: {str(e)}]", True
+    
+    async def _agenerate_response(self, query: str, context: str) -> Tuple[str, bool]:
+        """Async _generate_response, awaiting the completion on AsyncOpenAI."""
+        if not self.openai_client:
+            return self._generate_response(query, context)
+        
+        try:
+            client = await self._async_openai_client()
+            response = await client.chat.completions.create(**self._completion_args(query, context))
             
-            return response.choices[0].message.content.strip()
+            return response.choices[0].message.content.strip(), False
             
         except Exception as e:
             # Fallback response on error
-            return f"Based on the retrieved documents, here's what I found about '{query}':\n\n{context}\n\n[Error generating LLM response: {str(e)}]"
+            return f"Based on the retrieved documents, here's what I found about '{query}':\n\n{context}\n\n[Error generating LLM response: {str(e)}]", True
     
-    def batch_process(self, queries: List[str], strategy: str = "hybrid", 
-                     top_k: int = 5) -> List[Dict[str, Any]]:
-        """Process multiple queries in batch."""
-        results = []
+    def _completion_args(self, query: str, context: str) -> Dict[str, Any]:
+        """Chat completion arguments shared by the sync and async clients."""
+        user_prompt = self._USER_PROMPT_TEMPLATE.format(query=query, context=context)
+        return {
+            'model': self.CHAT_MODEL,
+            'messages': [
+                self._SYSTEM_MSG,
+                {"role": "user", "content": user_prompt}
+            ],
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens
+        }
+    
+    async def _async_openai_client(self):
+        """AsyncOpenAI client for the running event loop, created on first use.
+        
+        Calls on the same loop share its connection pool. The client is closed
+        when the loop shuts down its async generators, as asyncio.run does on
+        exit; loops driven without shutdown_asyncgens() leave it to garbage
+        collection.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._async_openai_clients.get(loop)
+        if entry is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=self.openai_client.api_key, http_client=new_async_http_client())
+            closer = _close_at_loop_shutdown(client)
+            entry = self._async_openai_clients[loop] = (client, closer)
+            # Starting the generator registers it with the loop's shutdown_asyncgens()
+            await closer.asend(None)
+        return entry[0]
+    
+    def process_queries(self, queries: List[str], strategy: str = "hybrid", top_k: int = 5,
+                        include_explanation: bool = False) -> List[Dict[str, Any]]:
+        """Process multiple queries, returning results in query order.
+        
+        Cached answers are returned as they are. The remaining hybrid queries
+        are retrieved together with HybridRetriever.retrieve_batch (one
+        embedding request and one Cypher query per strategy); answers are
+        then generated concurrently.
+        """
+        if not queries:
+            return []
         
-        for query in queries:
-            result = self.process_query(query, strategy, top_k)
-            results.append(result)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        keys: List[Optional[str]] = [None] * len(queries)
+        if self.use_cache:
+            keys = [self._response_key(query, strategy, top_k, include_explanation) for query in queries]
+            results = [self._cached_response(key) for key in keys]
+        
+        pending = [position for position, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        pending_queries = [queries[position] for position in pending]
+        
+        retrieved = None
+        if strategy == "hybrid":
+            try:
+                retrieved = self.retriever.retrieve_batch(pending_queries, top_k)
+            except Exception:
+                # Fall back to per-query retrieval so one bad query only fails itself
+                retrieved = None
+        
+        with ThreadPoolExecutor(max_workers=min(len(pending_queries), self.MAX_BATCH_WORKERS)) as executor:
+            if retrieved is None:
+                answers = executor.map(
+                    lambda query: self._process_query(query, strategy, top_k, include_explanation), pending_queries
+                )
+            else:
+                answers = executor.map(
+                    lambda item: self._answer(item[0], strategy, top_k, item[1], include_explanation),
+                    zip(pending_queries, retrieved)
+                )
+            for position, result in zip(pending, answers):
+                results[position] = result
+                if keys[position] is not None:
+                    self._store_response(keys[position], result)
         
         return results
     
+    def cache_stats(self) -> Dict[str, Any]:
+        """Response cache hits, misses, hit rate and current size."""
+        with self._response_cache_lock:
+            hits, misses, size = self._cache_hits, self._cache_misses, len(self._response_cache)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'size': size
+        }
+    
+    def clear_cache(self):
+        """Drop all cached answers and reset the hit/miss counters."""
+        with self._response_cache_lock:
+            self._response_cache.clear()
+            self._cache_hits = 0
+            self._cache_misses = 0
+    
+    def save_cache(self):
+        """Write the unexpired cached answers to response_cache_path, if configured."""
+        if not self._response_cache_path:
+            return
+        now = time.time()
+        with self._response_cache_lock:
+            snapshot = {
+                key: entry for key, entry in self._response_cache.items()
+                if now - entry[0] <= self._response_cache_ttl
+            }
+        directory = os.path.dirname(self._response_cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename, so an interrupted save never leaves a truncated cache
+        tmp_path = f"{self._response_cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._response_cache_path)
+    
+    def _load_cache(self):
+        """Load unexpired answers written by save_cache (a trusted local file)."""
+        try:
+            with open(self._response_cache_path, 'rb') as f:
+                entries = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading response cache: {e}")
+            return
+        now = time.time()
+        # Oldest first, so the newest answers are the last to be evicted
+        for key, entry in sorted(entries.items(), key=lambda item: item[1][0]):
+            if now - entry[0] <= self._response_cache_ttl:
+                self._response_cache[key] = entry
+    
+    def _response_key(self, query: str, strategy: str, top_k: int, include_explanation: bool) -> str:
+        """Digest of the request and every setting the answer depends on.
+        
+        The database is identified by uri, user and name only; data written by
+        another process (e.g. run_ingest.py) is not detected, so clear_cache()
+        after re-ingesting.
+        """
+        retriever = self.retriever
+        parts = (
+            query, strategy, top_k, include_explanation,
+            self.uri, self.user, self.database, self.embedding_generator.model_name,
+            retriever.vector_weight, retriever.fulltext_weight, retriever.semantic_weight,
+            retriever.rrf_k, retriever.vector_store.generation,
+            self.max_context_length, self.temperature, self.max_tokens,
+            self.CHAT_MODEL, self.openai_client is not None
+        )
+        return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _cached_response(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached answer for key, or None (expired answers are dropped)."""
+        with self._response_cache_lock:
+            entry = self._response_cache.get(key)
+            if entry is not None and time.time() - entry[0] > self._response_cache_ttl:
+                del self._response_cache[key]
+                entry = None
+            if entry is None:
+                self._cache_misses += 1
+                return None
+            self._cache_hits += 1
+        return dict(entry[1])
+    
+    def _store_response(self, key: str, result: Dict[str, Any]):
+        # Errors and fallback answers are not cached, so the next call retries the LLM
+        if 'error' in result or result.get('fallback'):
+            return
+        with self._response_cache_lock:
+            self._response_cache[key] = (time.time(), dict(result))
+    
+    def batch_process(self, queries: List[str], strategy: str = "hybrid", 
+                     top_k: int = 5) -> List[Dict[str, Any]]:
+        """Process multiple queries concurrently, returning results in query order."""
+        return self.process_queries(queries, strategy, top_k)
+    
     def set_pipeline_config(self, max_context_length: int = None, 
                            temperature: float = None, max_tokens: int = None):
         """Set pipeline configuration parameters."""
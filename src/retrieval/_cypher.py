@@ -0,0 +1,36 @@
+"""
+Identifier allowlist shared by the Neo4j retrievers.
+"""
+
+import re
+from typing import Iterable, Optional, Set
+from config.settings import get_settings
+
+_INDEX_NAME = re.compile(r'[A-Za-z][A-Za-z0-9_]*')
+
+class IdentifierAllowlist:
+    """Labels and properties that may be interpolated into Cypher text.
+
+    Labels and property names cannot be query parameters, so they are checked
+    against this list before they reach a query; that also bounds the number
+    of distinct query texts in Neo4j's plan cache.
+    """
+
+    def __init__(self, labels: Optional[Set[str]] = None, properties: Optional[Set[str]] = None):
+        """Use the given names, or indexes.allowed_labels / allowed_properties from the settings."""
+        settings = get_settings()
+        self.labels = set(labels if labels is not None else settings.allowed_labels)
+        self.properties = set(properties if properties is not None else settings.allowed_properties)
+
+    def check(self, label: Optional[str] = None, properties: Iterable[str] = ()):
+        """Raise ValueError for a label or property outside the allowlist."""
+        if label is not None and label not in self.labels:
+            raise ValueError(f"Label not allowed: {label!r}")
+        for property in properties:
+            if property not in self.properties:
+                raise ValueError(f"Property not allowed: {property!r}")
+
+def check_index_name(index_name: str):
+    """Raise ValueError unless index_name is a plain identifier (letters, digits, '_')."""
+    if not isinstance(index_name, str) or _INDEX_NAME.fullmatch(index_name) is None:
+        raise ValueError(f"Invalid index name: {index_name!r}")
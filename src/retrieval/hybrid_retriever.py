@@ -2,31 +2,122 @@
 Hybrid retriever implementation combining multiple search strategies.
 """
 
-from typing import List, Tuple, Dict, Any, Optional
+import functools
+import hashlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Tuple, Dict, Any, Optional
+from cachetools import TTLCache
 from config.settings import get_settings
+from db.driver import get_driver
+from embeddings.generator import EmbeddingGenerator, get_embedding_generator
 from .neo4j_vector_store import Neo4jVectorStore
-from .neo4j_fulltext_retriever import Neo4jFulltextRetriever
+from .neo4j_fulltext_retriever import TEXT_INDEX_NAME, Neo4jFulltextRetriever
+
+if TYPE_CHECKING:
+    import numpy as np
+
+@functools.lru_cache(maxsize=32)
+def _rrf_table(k: int, size: int) -> "np.ndarray":
+    """Reciprocal rank contributions 1/(k + rank) for ranks 1..size."""
+    import numpy as np
+    table = 1.0 / (k + np.arange(1, size + 1, dtype=np.float64))
+    table.flags.writeable = False
+    return table
+
+def _query_digest(query: str) -> bytes:
+    """Fixed-size cache key for a query string."""
+    return hashlib.blake2b(query.encode('utf-8'), digest_size=16).digest()
+
+# Row order of the per-strategy score breakdown
+_STRATEGY_NAMES = ("vector", "fulltext", "semantic")
+
+_IDENTIFIER = re.compile(r'[\w\-.]+')
+_IDENTIFIER_MARK = re.compile(r'[\d\-._]')
+
+# Characters with a meaning in Lucene query syntax
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+def _is_literal(query: str) -> bool:
+    """Whether a query is a literal lookup: a quoted phrase or one identifier-shaped token.
+    
+    A token is identifier-shaped if it contains a digit, '-', '.' or '_',
+    or is mixed case past its first letter ("HbA1c", "ACE-2", "doc_42");
+    plain words like "diabetes" are not literals.
+    """
+    query = query.strip()
+    if len(query) > 1 and query.startswith('"') and query.endswith('"'):
+        return True
+    if _IDENTIFIER.fullmatch(query) is None:
+        return False
+    if _IDENTIFIER_MARK.search(query):
+        return True
+    return any(c.isupper() for c in query[1:]) and any(c.islower() for c in query)
+
+def _lucene_literal(query: str) -> str:
+    """Lucene query text for a literal query, with its syntax characters escaped.
+    
+    A quoted phrase stays a phrase query; a token is matched as plain text,
+    so "ACE-2" is not read as an exclusion.
+    """
+    query = query.strip()
+    if len(query) > 1 and query.startswith('"') and query.endswith('"'):
+        inner = query[1:-1].replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{inner}"'
+    return _LUCENE_SPECIAL.sub(r'\\\1', query)
 
 class HybridRetriever:
     """Hybrid retriever that combines vector, fulltext, and semantic search."""
     
-    def __init__(self, uri: str = None, user: str = None, password: str = None):
-        """Initialize the hybrid retriever."""
+    # Three searches per hybrid query, for up to 16 queries in flight (LLMPipeline.batch_process)
+    MAX_CONCURRENT_SEARCHES = 48
+    
+    # Retrieval results are cached for repeated queries
+    CACHE_SIZE = 512
+    CACHE_TTL = 900  # seconds
+    
+    def __init__(self, uri: str = None, user: str = None, password: str = None,
+                 embedding_generator: Optional[EmbeddingGenerator] = None):
+        """Initialize the hybrid retriever, optionally with a specific embedding generator."""
         settings = get_settings()
         self.uri = uri or settings.neo4j_uri
         self.user = user or settings.neo4j_user
         self.password = password or settings.neo4j_password
         
-        self.vector_store = Neo4jVectorStore(self.uri, self.user, self.password)
-        self.fulltext_retriever = Neo4jFulltextRetriever(self.uri, self.user, self.password)
+        # Both sub-retrievers share one driver and so one connection pool
+        self.driver = get_driver(self.uri, self.user, self.password)
+        self.embedding_generator = embedding_generator or get_embedding_generator()
+        self.vector_store = Neo4jVectorStore(self.uri, self.user, self.password, driver=self.driver,
+                                             embedding_generator=self.embedding_generator)
+        self.fulltext_retriever = Neo4jFulltextRetriever(self.uri, self.user, self.password, driver=self.driver)
         
         # Default weights for different search strategies
         self.vector_weight = 0.4
         self.fulltext_weight = 0.3
         self.semantic_weight = 0.3
+        
+        # Reciprocal Rank Fusion constant (60 is the value from the original RRF paper)
+        self.rrf_k = 60
+        
+        # Literal lookups (quoted phrases, identifier-shaped tokens) are
+        # answered by the fulltext index alone, skipping the embedding call
+        self.literal_shortcircuit = True
+        
+        # Runs the per-strategy searches of a query concurrently; threads start on demand.
+        # Never more searches at once than the shared pool has connections, so a
+        # burst of hybrid calls queues here instead of timing out on acquisition
+        self._pool = ThreadPoolExecutor(
+            max_workers=min(self.MAX_CONCURRENT_SEARCHES, settings.neo4j_max_pool_size),
+            thread_name_prefix="hybrid-retriever"
+        )
+        
+        self._cache = TTLCache(maxsize=self.CACHE_SIZE, ttl=self.CACHE_TTL)
+        self._cache_lock = threading.Lock()
     
     def close(self):
         """Close all database connections."""
+        self._pool.shutdown(wait=True)
         self.vector_store.close()
         self.fulltext_retriever.close()
     
@@ -46,100 +137,262 @@ class HybridRetriever:
         self.fulltext_weight /= total_weight
         self.semantic_weight /= total_weight
     
-    def retrieve(self, query: str, top_k: int = 5, strategy: str = "hybrid") -> List[Tuple[Dict, float]]:
-        """Retrieve documents using the specified strategy."""
+    def retrieve(self, query: str, top_k: int = 5, strategy: str = "hybrid",
+                 query_vector: Optional[List[float]] = None) -> List[Tuple[Dict, float]]:
+        """Retrieve documents using the specified strategy.
+        
+        Results are cached per (strategy, query, top_k, weights) for CACHE_TTL
+        seconds. query_vector, if given, is used instead of embedding the query
+        again and bypasses the cache.
+        """
+        if query_vector is not None:
+            return self._dispatch(query, top_k, strategy, query_vector)
+        
+        key = self._cache_key(strategy, query, top_k)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return list(cached)
+        
+        results = self._dispatch(query, top_k, strategy)
+        with self._cache_lock:
+            self._cache[key] = tuple(results)
+        return results
+    
+    def rescore(self, query: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
+        """Re-fuse the cached rankings of a previous hybrid retrieval with the current weights.
+        
+        Does no I/O; raises KeyError if the query's rankings are not cached
+        (e.g. it was never retrieved at this top_k).
+        """
+        rankings = self._cached_rankings(self._rankings_key(query, top_k * 2))
+        if rankings is None:
+            raise KeyError(f"No cached rankings for query: {query!r}")
+        results, _ = self._combine_and_rerank(*rankings, top_k)
+        return results
+    
+    def retrieve_batch(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[Dict, float]]]:
+        """Hybrid retrieval for several queries at once, one result list per query.
+        
+        Uncached queries are embedded in one request and each strategy runs as
+        one UNWIND query for all of them, instead of three round-trips per
+        query. Results match retrieve(query, top_k) and share its cache.
+        """
+        results: List[Optional[List[Tuple[Dict, float]]]] = [None] * len(queries)
+        keys = [self._cache_key("hybrid", query, top_k) for query in queries]
+        with self._cache_lock:
+            for position, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    results[position] = list(cached)
+        
+        # Duplicates are fetched once
+        pending = list(dict.fromkeys(query for query, result in zip(queries, results) if result is None))
+        if pending:
+            fetched = dict(zip(pending, self._hybrid_retrieve_batch(pending, top_k)))
+            with self._cache_lock:
+                for position, query in enumerate(queries):
+                    if results[position] is None:
+                        self._cache[keys[position]] = tuple(fetched[query])
+                        results[position] = list(fetched[query])
+        return results
+    
+    def clear_cache(self):
+        """Forget all cached retrieval results."""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def _cache_key(self, strategy: str, query: str, top_k: int) -> tuple:
+        """Result cache key; includes everything that changes the ranking."""
+        return (strategy, _query_digest(query), top_k,
+                round(self.vector_weight, 3), round(self.fulltext_weight, 3), round(self.semantic_weight, 3),
+                self.rrf_k, self.literal_shortcircuit, self.vector_store.generation)
+    
+    def _dispatch(self, query: str, top_k: int, strategy: str,
+                  query_vector: Optional[List[float]] = None) -> List[Tuple[Dict, float]]:
+        """Run the requested strategy without consulting the result cache."""
         if strategy == "vector":
-            return self.vector_store.vector_search(query, top_k)
+            return self.vector_store.vector_search(query, top_k, query_vector=query_vector)
         elif strategy == "fulltext":
             return self.fulltext_retriever.fulltext_search(query, "documentFulltextIndex", top_k)
         elif strategy == "semantic":
             return self.fulltext_retriever.semantic_search(query, "Document", "text", top_k)
         elif strategy == "hybrid":
-            return self._hybrid_retrieve(query, top_k)
+            return self._hybrid_retrieve(query, top_k, query_vector)
         else:
             raise ValueError(f"Unknown strategy: {strategy}")
     
-    def _hybrid_retrieve(self, query: str, top_k: int) -> List[Tuple[Dict, float]]:
+    def _hybrid_retrieve(self, query: str, top_k: int,
+                         query_vector: Optional[List[float]] = None) -> List[Tuple[Dict, float]]:
         """Perform hybrid retrieval combining multiple strategies."""
-        # Get results from each strategy
-        vector_results = self.vector_store.vector_search(query, top_k * 2)
-        fulltext_results = self.fulltext_retriever.fulltext_search(query, "documentFulltextIndex", top_k * 2)
-        semantic_results = self.fulltext_retriever.semantic_search(query, "Document", "text", top_k * 2)
+        vector_results, fulltext_results, semantic_results = self._retrieve_all(query, top_k * 2, query_vector)
         
         # Combine and rerank results
-        combined_results = self._combine_and_rerank(
+        combined_results, _ = self._combine_and_rerank(
             vector_results, fulltext_results, semantic_results, top_k
         )
         
         return combined_results
     
+    def _hybrid_retrieve_batch(self, queries: List[str], top_k: int) -> List[List[Tuple[Dict, float]]]:
+        """Batched _hybrid_retrieve: three queries in total, run concurrently."""
+        limit = top_k * 2
+        literals = [query for query in queries if self._shortcircuits(query)]
+        full = [query for query in queries if not self._shortcircuits(query)]
+        
+        # Literal queries search both fulltext indexes and skip the vector search
+        # (see _retrieve_all)
+        fulltext_future = self._pool.submit(
+            self.fulltext_retriever.fulltext_search_batch,
+            [_lucene_literal(query) if query in literals else query for query in queries],
+            "documentFulltextIndex", limit
+        )
+        literal_text_future = self._pool.submit(
+            self.fulltext_retriever.fulltext_search_batch,
+            [_lucene_literal(query) for query in literals], TEXT_INDEX_NAME, limit
+        )
+        vector_future = self._pool.submit(self.vector_store.vector_search_batch, full, limit)
+        semantic_future = self._pool.submit(
+            self.fulltext_retriever.semantic_search_batch, full, "Document", "text", limit
+        )
+        fulltext_results = fulltext_future.result()
+        branches = dict(zip(full, zip(vector_future.result(), semantic_future.result())))
+        branches.update((query, ((), text)) for query, text in zip(literals, literal_text_future.result()))
+        
+        results = []
+        for query, fulltext in zip(queries, fulltext_results):
+            vector, semantic = branches[query]
+            # Cached like _retrieve_all, so explain_retrieval and rescore reuse them
+            with self._cache_lock:
+                self._cache[self._rankings_key(query, limit)] = (tuple(vector), tuple(fulltext), tuple(semantic))
+            results.append(self._combine_and_rerank(list(vector), fulltext, list(semantic), top_k)[0])
+        return results
+    
+    def _retrieve_all(self, query: str, limit: int,
+                      query_vector: Optional[List[float]] = None) -> Tuple[List[Tuple[Dict, float]], ...]:
+        """Run the vector, fulltext and semantic searches concurrently.
+        
+        The per-strategy lists are cached on their own, independent of the
+        weights, so hybrid retrieval, explain_retrieval and rescore share them
+        and a weight change only reruns the fusion. Literal queries (see
+        literal_shortcircuit) skip the embedding: they are matched verbatim
+        against the title/source index (the fulltext list) and the text index
+        (in place of the word-overlap list), and their vector list is empty.
+        """
+        key = None
+        if query_vector is None:
+            key = self._rankings_key(query, limit)
+            cached = self._cached_rankings(key)
+            if cached is not None:
+                return cached
+        
+        if self._shortcircuits(query):
+            lucene_query = _lucene_literal(query)
+            fulltext_future = self._pool.submit(
+                self.fulltext_retriever.fulltext_search, lucene_query, "documentFulltextIndex", limit
+            )
+            text_future = self._pool.submit(
+                self.fulltext_retriever.fulltext_search, lucene_query, TEXT_INDEX_NAME, limit
+            )
+            all_results = ([], fulltext_future.result(), text_future.result())
+        else:
+            vector_future = self._pool.submit(
+                self.vector_store.vector_search, query, limit, query_vector=query_vector
+            )
+            fulltext_future = self._pool.submit(
+                self.fulltext_retriever.fulltext_search, query, "documentFulltextIndex", limit
+            )
+            semantic_future = self._pool.submit(
+                self.fulltext_retriever.semantic_search, query, "Document", "text", limit
+            )
+            all_results = (vector_future.result(), fulltext_future.result(), semantic_future.result())
+        
+        if key is not None:
+            with self._cache_lock:
+                self._cache[key] = tuple(tuple(results) for results in all_results)
+        return all_results
+    
+    def _rankings_key(self, query: str, limit: int) -> tuple:
+        """Cache key of the per-strategy result lists for a query."""
+        return ("rankings", _query_digest(query), limit, self._shortcircuits(query), self.vector_store.generation)
+    
+    def _shortcircuits(self, query: str) -> bool:
+        """Whether hybrid retrieval answers query from the fulltext index alone."""
+        return self.literal_shortcircuit and _is_literal(query)
+    
+    def _cached_rankings(self, key: tuple) -> Optional[Tuple[List[Tuple[Dict, float]], ...]]:
+        """Cached per-strategy result lists, or None."""
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is None:
+            return None
+        return tuple(list(results) for results in cached)
+    
     def _combine_and_rerank(self, vector_results: List[Tuple[Dict, float]], 
                            fulltext_results: List[Tuple[Dict, float]],
                            semantic_results: List[Tuple[Dict, float]], 
-                           top_k: int) -> List[Tuple[Dict, float]]:
-        """Combine results from different strategies and rerank them."""
-        # Create a dictionary to store combined scores
-        combined_scores = {}
-        
-        # Add vector search scores
-        for node, score in vector_results:
-            node_id = node.id
-            combined_scores[node_id] = {
-                'node': node,
-                'vector_score': score,
-                'fulltext_score': 0.0,
-                'semantic_score': 0.0,
-                'combined_score': score * self.vector_weight
-            }
-        
-        # Add fulltext search scores
-        for node, score in fulltext_results:
-            node_id = node.id
-            if node_id in combined_scores:
-                combined_scores[node_id]['fulltext_score'] = score
-                combined_scores[node_id]['combined_score'] += score * self.fulltext_weight
-            else:
-                combined_scores[node_id] = {
-                    'node': node,
-                    'vector_score': 0.0,
-                    'fulltext_score': score,
-                    'semantic_score': 0.0,
-                    'combined_score': score * self.fulltext_weight
-                }
-        
-        # Add semantic search scores
-        for node, score in semantic_results:
-            node_id = node.id
-            if node_id in combined_scores:
-                combined_scores[node_id]['semantic_score'] = score
-                combined_scores[node_id]['combined_score'] += score * self.semantic_weight
-            else:
-                combined_scores[node_id] = {
-                    'node': node,
-                    'vector_score': 0.0,
-                    'fulltext_score': 0.0,
-                    'semantic_score': score,
-                    'combined_score': score * self.semantic_weight
-                }
-        
-        # Sort by combined score and return top_k
-        sorted_results = sorted(
-            combined_scores.values(),
-            key=lambda x: x['combined_score'],
-            reverse=True
+                           top_k: int) -> Tuple[List[Tuple[Dict, float]], Dict[int, Dict[str, float]]]:
+        """Fuse ranked result lists with weighted Reciprocal Rank Fusion.
+        
+        Each list contributes weight / (rrf_k + rank) per document, so the raw
+        scores (cosine, BM25, word overlap) never need to be on the same scale.
+        Returns the fused results and, per returned node id, each strategy's
+        contribution to its score.
+        """
+        import numpy as np
+        lists = ((vector_results, self.vector_weight),
+                 (fulltext_results, self.fulltext_weight),
+                 (semantic_results, self.semantic_weight))
+        longest = max(len(results) for results, _ in lists)
+        if not longest or top_k <= 0:
+            return [], {}
+        
+        table = _rrf_table(self.rrf_k, longest)
+        node_objs, id_parts, contrib_parts = [], [], []
+        
+        for results, weight in lists:
+            list_ids = np.fromiter((node.id for node, _score in results), np.int64, len(results))
+            # Only the best rank of a duplicate counts
+            _, first = np.unique(list_ids, return_index=True)
+            first.sort()
+            node_objs.extend(results[i][0] for i in first)
+            id_parts.append(list_ids[first])
+            contrib_parts.append(weight * table[first])
+        
+        unique_ids, first_seen, inverse = np.unique(
+            np.concatenate(id_parts), return_index=True, return_inverse=True
         )
+        # One row of contributions per strategy, one column per document
+        contributions = np.zeros((len(lists), len(unique_ids)))
+        start = 0
+        for row, contrib in enumerate(contrib_parts):
+            contributions[row, inverse[start:start + len(contrib)]] = contrib
+            start += len(contrib)
+        combined = contributions.sum(axis=0)
         
-        return [(item['node'], item['combined_score']) for item in sorted_results[:top_k]]
+        if top_k < len(combined):
+            candidates = np.argpartition(-combined, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(combined))
+        # Highest score first; ties keep the order documents were first seen in
+        order = candidates[np.lexsort((first_seen[candidates], -combined[candidates]))]
+        
+        results = [(node_objs[first_seen[i]], float(combined[i])) for i in order]
+        breakdown = {
+            int(unique_ids[i]): dict(zip(_STRATEGY_NAMES, contributions[:, i].tolist()))
+            for i in order
+        }
+        return results, breakdown
     
     def explain_retrieval(self, query: str, top_k: int = 5) -> Dict[str, Any]:
         """Explain the retrieval process and show scores from each strategy."""
-        # Get results from each strategy
-        vector_results = self.vector_store.vector_search(query, top_k)
-        fulltext_results = self.fulltext_retriever.fulltext_search(query, "documentFulltextIndex", top_k)
-        semantic_results = self.fulltext_retriever.semantic_search(query, "Document", "text", top_k)
+        # Fetch once at the hybrid depth; each strategy's top_k is a prefix of that
+        vector_all, fulltext_all, semantic_all = self._retrieve_all(query, top_k * 2)
+        vector_results = vector_all[:top_k]
+        fulltext_results = fulltext_all[:top_k]
+        semantic_results = semantic_all[:top_k]
         
-        # Get hybrid results
-        hybrid_results = self._hybrid_retrieve(query, top_k)
+        hybrid_results, score_breakdown = self._combine_and_rerank(vector_all, fulltext_all, semantic_all, top_k)
         
         explanation = {
             'query': query,
@@ -152,6 +405,8 @@ class HybridRetriever:
             'fulltext_results': fulltext_results,
             'semantic_results': semantic_results,
             'hybrid_results': hybrid_results,
+            'score_breakdown': score_breakdown,
+            'literal_shortcircuit': self._shortcircuits(query),
             'total_results': len(hybrid_results)
         }
         
@@ -164,9 +419,16 @@ class HybridRetriever:
             "documentEmbeddingIndex", "Document", "embedding", 1536
         )
         
-        print("Creating fulltext index...")
+        # Same definitions as db/create_indexes.cypher
+        print("Creating fulltext indexes...")
         self.fulltext_retriever.create_fulltext_index(
-            "documentFulltextIndex", "Document", ["text"]
+            "documentFulltextIndex", "Document", ["title", "source"]
         )
+        self.fulltext_retriever.create_fulltext_index(
+            TEXT_INDEX_NAME, "Document", ["text"]
+        )
+        
+        # Results retrieved before the indexes existed are stale
+        self.clear_cache()
         
         print("All indexes created successfully!")
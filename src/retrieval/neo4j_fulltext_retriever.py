@@ -2,121 +2,287 @@
 Neo4j fulltext retriever implementation for the hybridRAG system.
 """
 
-from typing import List, Tuple, Dict, Any
-from neo4j import GraphDatabase
+import functools
+import re
+from typing import List, Tuple, Dict, Any, Optional, Set
+from cachetools import TTLCache
+from neo4j import Driver
 from config.settings import get_settings
+from db.driver import get_driver, run_batch_read, run_read
+from utils.logging import get_logger
+from ._cypher import IdentifierAllowlist, check_index_name
+
+logger = get_logger("retrieval")
+
+# Fulltext index on Document.text (db/create_indexes.cypher), kept apart from
+# the title/source index so word-overlap search is its own signal
+TEXT_INDEX_NAME = "documentTextFulltextIndex"
 
 class Neo4jFulltextRetriever:
     """Neo4j fulltext retriever for text-based search."""
     
-    def __init__(self, uri: str = None, user: str = None, password: str = None):
-        """Initialize the Neo4j fulltext retriever."""
+    # fuzzy_search scores this many index candidates per requested result
+    FUZZY_CANDIDATE_FACTOR = 20
+    
+    # Seconds before a fulltext index found missing is looked up again
+    INDEX_RECHECK_INTERVAL = 60
+    
+    def __init__(self, uri: str = None, user: str = None, password: str = None,
+                 driver: Optional[Driver] = None,
+                 allowed_labels: Optional[Set[str]] = None,
+                 allowed_properties: Optional[Set[str]] = None):
+        """Initialize the Neo4j fulltext retriever, optionally on an existing driver."""
         settings = get_settings()
         self.uri = uri or settings.neo4j_uri
         self.user = user or settings.neo4j_user
         self.password = password or settings.neo4j_password
+        self.database = settings.neo4j_database
+        
+        self.driver = driver or get_driver(self.uri, self.user, self.password)
         
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+        self.allowlist = IdentifierAllowlist(allowed_labels, allowed_properties)
+        
+        # Fulltext index name -> indexed properties. An existing index is looked
+        # up once; a missing one again after INDEX_RECHECK_INTERVAL, so an index
+        # created by another process (run_ingest.py) is picked up
+        self._index_properties: Dict[str, frozenset] = {}
+        self._missing_indexes = TTLCache(maxsize=32, ttl=self.INDEX_RECHECK_INTERVAL)
     
     def close(self):
-        """Close the database connection."""
-        if self.driver:
-            self.driver.close()
+        """Release the database connection (the shared driver is closed at exit)."""
+        self.driver = None
     
     def create_fulltext_index(self, index_name: str, label: str, properties: List[str]):
         """Create a fulltext index on node properties."""
+        self.allowlist.check(label, properties)
+        check_index_name(index_name)
         with self.driver.session() as session:
-            properties_str = ', '.join([f'n.{prop}' for prop in properties])
-            query = f"""
-            CALL db.index.fulltext.createNodeIndex(
-                '{index_name}',
-                '{label}',
-                [{properties_str}]
-            )
+            query = """
+            CALL db.index.fulltext.createNodeIndex($index_name, [$label], $properties)
             """
             try:
-                session.run(query)
+                session.run(query, index_name=index_name, label=label, properties=list(properties))
+                self._index_properties.pop(index_name, None)
+                self._missing_indexes.pop(index_name, None)
                 print(f"Fulltext index '{index_name}' created successfully")
             except Exception as e:
                 print(f"Index creation failed (may already exist): {e}")
     
     def fulltext_search(self, query: str, index_name: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
         """Perform fulltext search using the specified index."""
-        with self.driver.session() as session:
-            cypher_query = f"""
-            CALL db.index.fulltext.queryNodes(
-                '{index_name}',
-                $search_text
-            )
-            YIELD node, score
-            RETURN node, score
-            ORDER BY score DESC
-            LIMIT {top_k}
-            """
-            
-            result = session.run(cypher_query, search_text=query)
-            return [(record["node"], record["score"]) for record in result]
+        return self._run_read(_build_query("fulltext"), index_name=index_name, search_text=query, top_k=top_k)
     
     def fuzzy_search(self, query: str, label: str, property: str, top_k: int = 5, 
-                    similarity_threshold: float = 0.7) -> List[Tuple[Dict, float]]:
-        """Perform fuzzy search using string similarity."""
-        with self.driver.session() as session:
-            cypher_query = f"""
-            MATCH (n:{label})
-            WITH n, apoc.text.fuzzyMatch(n.{property}, $search_text) as similarity
-            WHERE similarity >= $threshold
-            RETURN n, similarity as score
-            ORDER BY similarity DESC
-            LIMIT {top_k}
-            """
-            
-            result = session.run(cypher_query, search_text=query, threshold=similarity_threshold)
-            return [(record["n"], record["score"]) for record in result]
+                    similarity_threshold: float = 0.7,
+                    index_name: str = TEXT_INDEX_NAME) -> List[Tuple[Dict, float]]:
+        """Perform fuzzy search using string similarity.
+        
+        Candidates come from a Lucene fuzzy query on the fulltext index
+        (FUZZY_CANDIDATE_FACTOR * top_k of them), so the string-similarity
+        function only runs on those instead of every `label` node. If
+        index_name does not cover `property`, every `label` node is scored.
+        """
+        self.allowlist.check(label, [property])
+        if not self._index_covers(index_name, property):
+            return self._run_read(
+                _build_query("fuzzy_scan", label, property),
+                search_text=query, threshold=similarity_threshold, top_k=top_k
+            )
+        tokens = _tokenize(query)
+        if not tokens:
+            return []
+        lucene_query = f"{property}:({' '.join(f'{token}~2' for token in tokens)})"
+        
+        return self._run_read(
+            _build_query("fuzzy", property=property),
+            index_name=index_name, lucene_query=lucene_query, label=label,
+            candidate_k=top_k * self.FUZZY_CANDIDATE_FACTOR,
+            search_text=query, threshold=similarity_threshold, top_k=top_k
+        )
     
     def regex_search(self, pattern: str, label: str, property: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
         """Perform regex search on text properties."""
-        with self.driver.session() as session:
-            query_cypher = f"""
-            MATCH (n:{label})
-            WHERE n.{property} =~ $pattern
-            RETURN n, 1.0 as score
-            LIMIT {top_k}
-            """
-            
-            result = session.run(query_cypher, pattern=pattern)
-            return [(record["n"], record["score"]) for record in result]
+        self.allowlist.check(label, [property])
+        return self._run_read(_build_query("regex", label, property), pattern=pattern, top_k=top_k)
     
     def phrase_search(self, phrase: str, label: str, property: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
         """Search for exact phrases in text."""
-        with self.driver.session() as session:
-            query_cypher = f"""
-            MATCH (n:{label})
-            WHERE n.{property} CONTAINS $phrase
-            RETURN n, 1.0 as score
-            ORDER BY size(n.{property}) ASC
-            LIMIT {top_k}
-            """
-            
-            result = session.run(query_cypher, phrase=phrase)
-            return [(record["n"], record["score"]) for record in result]
+        self.allowlist.check(label, [property])
+        return self._run_read(_build_query("phrase", label, property), phrase=phrase, top_k=top_k)
     
-    def semantic_search(self, query: str, label: str, property: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
-        """Perform semantic search using text analysis."""
-        with self.driver.session() as session:
-            # This is a simplified semantic search - you might want to implement
-            # more sophisticated text analysis
-            cypher_query = f"""
-            MATCH (n:{label})
-            WITH n, 
-                 size([word IN split(toLower(n.{property}), ' ') 
-                       WHERE word IN split(toLower($search_text), ' ')]) as common_words,
-                 size(split(toLower(n.{property}), ' ')) as total_words
-            WHERE common_words > 0
-            RETURN n, 
-                   (common_words * 1.0 / total_words) as score
-            ORDER BY score DESC
-            LIMIT {top_k}
-            """
-            
-            result = session.run(cypher_query, search_text=query)
-            return [(record["n"], record["score"]) for record in result]
+    def semantic_search(self, query: str, label: str, property: str, top_k: int = 5,
+                        index_name: str = TEXT_INDEX_NAME) -> List[Tuple[Dict, float]]:
+        """Perform word-overlap search through the fulltext index.
+        
+        The query is tokenized in Python and sent as an OR of its words on
+        `property`, so Lucene scores the overlap instead of Cypher scanning
+        every `label` node. If index_name does not cover `property`, the
+        overlap is computed by scanning the label instead.
+        """
+        self.allowlist.check(label, [property])
+        tokens = _tokenize(query)
+        if not tokens:
+            return []
+        if not self._index_covers(index_name, property):
+            return self._run_read(_build_query("semantic_scan", label, property), tokens=tokens, top_k=top_k)
+        lucene_query = f"{property}:({' OR '.join(tokens)})"
+        
+        return self._run_read(
+            _build_query("semantic"),
+            index_name=index_name, lucene_query=lucene_query, label=label, top_k=top_k
+        )
+    
+    def fulltext_search_batch(self, queries: List[str], index_name: str,
+                              top_k: int = 5) -> List[List[Tuple[Dict, float]]]:
+        """Fulltext search for several queries in one Cypher query, one result list per query."""
+        if not queries:
+            return []
+        return run_batch_read(
+            self.driver, self.database, _build_query("fulltext_batch"), len(queries),
+            index_name=index_name, queries=queries, top_k=top_k
+        )
+    
+    def semantic_search_batch(self, queries: List[str], label: str, property: str, top_k: int = 5,
+                              index_name: str = TEXT_INDEX_NAME) -> List[List[Tuple[Dict, float]]]:
+        """Word-overlap search for several queries in one Cypher query, one result list per query."""
+        self.allowlist.check(label, [property])
+        if not self._index_covers(index_name, property):
+            return [self.semantic_search(query, label, property, top_k, index_name) for query in queries]
+        positions, lucene_queries = [], []
+        for position, query in enumerate(queries):
+            tokens = _tokenize(query)
+            # Queries without words have no hits, same as semantic_search
+            if tokens:
+                positions.append(position)
+                lucene_queries.append(f"{property}:({' OR '.join(tokens)})")
+        
+        results = [[] for _ in queries]
+        if lucene_queries:
+            hits = run_batch_read(
+                self.driver, self.database, _build_query("semantic_batch"), len(lucene_queries),
+                index_name=index_name, queries=lucene_queries, label=label, top_k=top_k
+            )
+            for position, query_hits in zip(positions, hits):
+                results[position] = query_hits
+        return results
+    
+    def _index_covers(self, index_name: str, property: str) -> bool:
+        """Whether the fulltext index index_name exists and indexes property.
+        
+        False means the caller falls back to a label scan, which is always
+        correct but reads every node; that is logged once per lookup.
+        """
+        properties = self._index_properties.get(index_name)
+        if properties is None:
+            properties = self._missing_indexes.get(index_name)
+        if properties is None:
+            try:
+                with self.driver.session(database=self.database) as session:
+                    record = session.run(
+                        "SHOW FULLTEXT INDEXES YIELD name, properties WHERE name = $index_name RETURN properties",
+                        index_name=index_name
+                    ).single()
+            except Exception as e:
+                # Not cached, so the next search asks again
+                logger.warning("Could not look up fulltext index %r, scanning instead: %s", index_name, e)
+                return False
+            if record:
+                properties = self._index_properties[index_name] = frozenset(record["properties"])
+            else:
+                properties = self._missing_indexes[index_name] = frozenset()
+            if property not in properties:
+                logger.warning("Fulltext index %r does not cover %r, scanning instead", index_name, property)
+        return property in properties
+    
+    def _run_read(self, cypher_query: str, **parameters) -> List[Tuple[Dict, float]]:
+        """Run a read query returning at most top_k (node, score) rows."""
+        return run_read(self.driver, self.database, cypher_query, **parameters)
+
+# Query templates; label and property cannot be Cypher parameters, everything else is
+_QUERY_TEMPLATES = {
+    "fulltext": """
+        CALL db.index.fulltext.queryNodes($index_name, $search_text)
+        YIELD node, score
+        RETURN node, score
+        ORDER BY score DESC
+        LIMIT $top_k
+        """,
+    "fuzzy": """
+        CALL db.index.fulltext.queryNodes($index_name, $lucene_query)
+        YIELD node
+        WHERE $label IN labels(node)
+        WITH node
+        LIMIT $candidate_k
+        WITH node, apoc.text.fuzzyMatch(node.{property}, $search_text) AS similarity
+        WHERE similarity >= $threshold
+        RETURN node, similarity AS score
+        ORDER BY similarity DESC
+        LIMIT $top_k
+        """,
+    # Label scan for fuzzy_search when no fulltext index covers the property
+    "fuzzy_scan": """
+        MATCH (node:{label})
+        WITH node, apoc.text.fuzzyMatch(node.{property}, $search_text) AS similarity
+        WHERE similarity >= $threshold
+        RETURN node, similarity AS score
+        ORDER BY similarity DESC
+        LIMIT $top_k
+        """,
+    "regex": """
+        MATCH (node:{label})
+        WHERE node.{property} =~ $pattern
+        RETURN node, 1.0 AS score
+        LIMIT $top_k
+        """,
+    "phrase": """
+        MATCH (node:{label})
+        WHERE node.{property} CONTAINS $phrase
+        RETURN node, 1.0 AS score
+        ORDER BY size(node.{property}) ASC
+        LIMIT $top_k
+        """,
+    "semantic": """
+        CALL db.index.fulltext.queryNodes($index_name, $lucene_query)
+        YIELD node, score
+        WHERE $label IN labels(node)
+        RETURN node, score
+        LIMIT $top_k
+        """,
+    # Label scan for semantic_search when no fulltext index covers the property
+    "semantic_scan": """
+        MATCH (node:{label})
+        WITH node, [word IN split(toLower(node.{property}), ' ') WHERE word <> ''] AS words
+        WITH node, size([word IN words WHERE word IN $tokens]) AS common_words, size(words) AS total_words
+        WHERE common_words > 0
+        RETURN node, common_words * 1.0 / total_words AS score
+        ORDER BY score DESC
+        LIMIT $top_k
+        """,
+    # Batched variants take a list of queries and return (i, hits) per query
+    "fulltext_batch": """
+        UNWIND range(0, size($queries) - 1) AS i
+        CALL db.index.fulltext.queryNodes($index_name, $queries[i])
+        YIELD node, score
+        WITH i, node, score
+        ORDER BY score DESC
+        RETURN i, collect({{node: node, score: score}})[..$top_k] AS hits
+        """,
+    "semantic_batch": """
+        UNWIND range(0, size($queries) - 1) AS i
+        CALL db.index.fulltext.queryNodes($index_name, $queries[i])
+        YIELD node, score
+        WHERE $label IN labels(node)
+        WITH i, node, score
+        ORDER BY score DESC
+        RETURN i, collect({{node: node, score: score}})[..$top_k] AS hits
+        """,
+}
+
+@functools.lru_cache(maxsize=128)
+def _build_query(kind: str, label: str = "", property: str = "") -> str:
+    """Build (once per kind/label/property) the Cypher text for a search."""
+    return _QUERY_TEMPLATES[kind].format(label=label, property=property)
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercased unique words of text, in order (word characters only, so no Lucene syntax)."""
+    return list(dict.fromkeys(re.findall(r"\w+", text.lower())))
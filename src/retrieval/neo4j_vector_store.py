@@ -2,88 +2,142 @@
 Neo4j vector store implementation for the hybridRAG system.
 """
 
-from typing import List, Tuple, Dict, Any, Optional
-from neo4j import GraphDatabase
+from typing import List, Tuple, Dict, Any, Optional, Set
+from neo4j import Driver
 from config.settings import get_settings
-from embeddings.generator import EmbeddingGenerator
+from db.driver import get_driver, run_batch_read, run_read
+from embeddings.generator import EmbeddingGenerator, get_embedding_generator
+from ._cypher import IdentifierAllowlist, check_index_name
 
 class Neo4jVectorStore:
     """Neo4j vector store for storing and retrieving vector embeddings."""
     
-    def __init__(self, uri: str = None, user: str = None, password: str = None):
-        """Initialize the Neo4j vector store."""
+    _VECTOR_SEARCH = """
+    CALL db.index.vector.queryNodes($index_name, $top_k, $query_embedding)
+    YIELD node, score
+    RETURN node, score
+    """
+    _VECTOR_SEARCH_FILTERED = """
+    CALL db.index.vector.queryNodes($index_name, $top_k, $query_embedding)
+    YIELD node, score
+    WHERE all(key IN keys($filter) WHERE node[key] = $filter[key])
+    RETURN node, score
+    """
+    _VECTOR_SEARCH_BATCH = """
+    UNWIND range(0, size($query_embeddings) - 1) AS i
+    CALL db.index.vector.queryNodes($index_name, $top_k, $query_embeddings[i])
+    YIELD node, score
+    RETURN i, collect({node: node, score: score}) AS hits
+    """
+    
+    def __init__(self, uri: str = None, user: str = None, password: str = None,
+                 driver: Optional[Driver] = None,
+                 allowed_labels: Optional[Set[str]] = None,
+                 allowed_properties: Optional[Set[str]] = None,
+                 embedding_generator: Optional[EmbeddingGenerator] = None):
+        """Initialize the Neo4j vector store, optionally on an existing driver and embedding generator."""
         settings = get_settings()
         self.uri = uri or settings.neo4j_uri
         self.user = user or settings.neo4j_user
         self.password = password or settings.neo4j_password
+        self.database = settings.neo4j_database
+        
+        self.driver = driver or get_driver(self.uri, self.user, self.password)
+        
+        self.allowlist = IdentifierAllowlist(allowed_labels, allowed_properties)
+        self.embedding_generator = embedding_generator or get_embedding_generator()
         
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
-        self.embedding_generator = EmbeddingGenerator()
+        # Bumped on every write so result caches can tell their entries are stale
+        self.generation = 0
     
     def close(self):
-        """Close the database connection."""
-        if self.driver:
-            self.driver.close()
+        """Release the database connection (the shared driver is closed at exit)."""
+        self.driver = None
     
     def create_vector_index(self, index_name: str, label: str, property: str, dimension: int = 1536):
         """Create a vector index on a node property."""
+        self.allowlist.check(label, [property])
+        check_index_name(index_name)
         with self.driver.session() as session:
-            query = f"""
-            CALL db.index.vector.createNodeIndex(
-                '{index_name}',
-                '{label}',
-                '{property}',
-                {dimension},
-                'cosine'
-            )
+            query = """
+            CALL db.index.vector.createNodeIndex($index_name, $label, $property, $dimension, 'cosine')
             """
             try:
-                session.run(query)
+                session.run(query, index_name=index_name, label=label, property=property,
+                            dimension=int(dimension))
                 print(f"Vector index '{index_name}' created successfully")
             except Exception as e:
                 print(f"Index creation failed (may already exist): {e}")
     
-    def store_embeddings(self, nodes: List[Dict[str, Any]], label: str, text_property: str = "text"):
-        """Store nodes with their embeddings in Neo4j."""
+    def store_embeddings(self, nodes: List[Dict[str, Any]], label: str, text_property: str = "text",
+                         batch_size: int = 1000):
+        """Store nodes with their embeddings in Neo4j, batch_size nodes per transaction."""
+        self.allowlist.check(label)
+        texts = [node.get(text_property, "") for node in nodes]
+        embeddings = self.embedding_generator.generate_embeddings(texts)
+        rows = [
+            {
+                "text": text,
+                "embedding": embedding,
+                "metadata": {k: v for k, v in node.items() if k != text_property}
+            }
+            for node, text, embedding in zip(nodes, texts, embeddings)
+        ]
+        
+        # setNodeVectorProperty stores the vector in the index's native float format
+        query = f"""
+        UNWIND $rows AS row
+        CREATE (n:{label})
+        SET n.text = row.text, n.metadata = row.metadata
+        WITH n, row
+        CALL db.create.setNodeVectorProperty(n, 'embedding', row.embedding)
+        """
+        
         with self.driver.session() as session:
-            for node in nodes:
-                # Generate embedding for the text
-                text = node.get(text_property, "")
-                embedding = self.embedding_generator.generate_embedding(text)
-                
-                # Store node with embedding
-                query = f"""
-                CREATE (n:{label} {{
-                    text: $text,
-                    embedding: $embedding,
-                    metadata: $metadata
-                }})
-                """
-                
-                metadata = {k: v for k, v in node.items() if k != text_property}
-                session.run(query, text=text, embedding=embedding, metadata=metadata)
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                session.execute_write(lambda tx: tx.run(query, rows=batch).consume())
+        
+        self.generation += 1
     
     def vector_search(self, query: str, top_k: int = 5, label: str = "Document", 
-                     index_name: str = "documentEmbeddingIndex") -> List[Tuple[Dict, float]]:
-        """Perform vector similarity search."""
-        # Generate embedding for the query
-        query_embedding = self.embedding_generator.generate_embedding(query)
+                     index_name: str = "documentEmbeddingIndex",
+                     query_vector: Optional[List[float]] = None,
+                     extra_filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Dict, float]]:
+        """Perform vector similarity search.
         
-        with self.driver.session() as session:
-            cypher_query = f"""
-            CALL db.index.vector.queryNodes(
-                '{index_name}',
-                {top_k},
-                $query_embedding
-            )
-            YIELD node, score
-            RETURN node, score
-            ORDER BY score DESC
-            LIMIT {top_k}
-            """
-            
-            result = session.run(cypher_query, query_embedding=query_embedding)
-            return [(record["node"], record["score"]) for record in result]
+        Pass query_vector to reuse an embedding the caller already has.
+        extra_filter is a map of property -> required value applied to the
+        index hits inside the same query, so fewer than top_k rows may match.
+        """
+        # Generate embedding for the query (cached by the generator)
+        query_embedding = query_vector if query_vector is not None else self.embedding_generator.generate_embedding(query)
+        
+        # queryNodes already returns the k best hits in score order
+        cypher_query = self._VECTOR_SEARCH_FILTERED if extra_filter else self._VECTOR_SEARCH
+        
+        return self._run_read(
+            cypher_query,
+            index_name=index_name,
+            top_k=top_k,
+            query_embedding=query_embedding,
+            filter=extra_filter or {}
+        )
+    
+    def vector_search_batch(self, queries: List[str], top_k: int = 5,
+                            index_name: str = "documentEmbeddingIndex") -> List[List[Tuple[Dict, float]]]:
+        """Vector search for several queries with one embedding call and one Cypher query.
+        
+        Returns one result list per query, in query order.
+        """
+        if not queries:
+            return []
+        query_embeddings = self.embedding_generator.generate_embeddings(queries)
+        
+        return run_batch_read(
+            self.driver, self.database, self._VECTOR_SEARCH_BATCH, len(queries),
+            index_name=index_name, top_k=top_k, query_embeddings=query_embeddings
+        )
     
     def hybrid_search(self, query: str, top_k: int = 5, label: str = "Document",
                      index_name: str = "documentEmbeddingIndex", 
@@ -105,16 +159,19 @@ class Neo4jVectorStore:
     
     def _simple_fulltext_search(self, query: str, top_k: int, label: str) -> List[Tuple[Dict, float]]:
         """Simple fulltext search implementation."""
-        with self.driver.session() as session:
-            cypher_query = f"""
-            MATCH (n:{label})
-            WHERE n.text CONTAINS $search_text
-            RETURN n, 0.5 as score
-            LIMIT {top_k}
-            """
-            
-            result = session.run(cypher_query, search_text=query)
-            return [(record["n"], record["score"]) for record in result]
+        self.allowlist.check(label)
+        cypher_query = f"""
+        MATCH (node:{label})
+        WHERE node.text CONTAINS $search_text
+        RETURN node, 0.5 as score
+        LIMIT $top_k
+        """
+        
+        return self._run_read(cypher_query, search_text=query, top_k=top_k)
+    
+    def _run_read(self, cypher_query: str, **parameters) -> List[Tuple[Dict, float]]:
+        """Run a read query returning at most top_k (node, score) rows."""
+        return run_read(self.driver, self.database, cypher_query, **parameters)
     
     def _combine_results(self, vector_results: List[Tuple[Dict, float]], 
                         fulltext_results: List[Tuple[Dict, float]],
@@ -0,0 +1,43 @@
+"""
+Shared HTTP clients for the OpenAI SDK.
+
+Every OpenAI client in the process sends its requests through one pooled
+connection set, so repeated embedding and completion calls reuse warm
+TLS connections. HTTP/2 is used when the h2 package is installed.
+"""
+
+import atexit
+import functools
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+# Connections kept open to the OpenAI API per client
+MAX_CONNECTIONS = 32
+
+def _client_options() -> dict:
+    import httpx
+    return {
+        'http2': h2 is not None,
+        'limits': httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+    }
+
+@functools.lru_cache(maxsize=1)
+def get_http_client():
+    """Get the process-wide httpx client for synchronous OpenAI clients, closed at exit."""
+    # The SDK's client subclasses keep its default timeouts and redirect handling
+    from openai import DefaultHttpxClient
+    client = DefaultHttpxClient(**_client_options())
+    atexit.register(client.close)
+    return client
+
+def new_async_http_client():
+    """Create an httpx async client with the same pool settings.
+
+    Async connections belong to the event loop that opened them, so callers
+    keep one per loop instead of sharing a single process-wide client.
+    """
+    from openai import DefaultAsyncHttpxClient
+    return DefaultAsyncHttpxClient(**_client_options())
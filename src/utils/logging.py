@@ -8,12 +8,22 @@ from pathlib import Path
 from typing import Optional
 from config.settings import get_settings
 
+# Arguments of the last setup_logging call, so repeated calls are free
+_configured_with = None
+_last_log_file = None
+
 def setup_logging(
     level: str = None,
     log_file: Optional[str] = None,
-    log_format: str = None
+    log_format: str = None,
+    force: bool = False
 ) -> logging.Logger:
-    """Set up logging configuration."""
+    """Set up logging configuration.
+    
+    Calling it again with the same arguments keeps the existing handlers;
+    pass force=True to rebuild them anyway.
+    """
+    global _configured_with, _last_log_file
     
     # Get settings
     settings = get_settings()
@@ -21,34 +31,42 @@ def setup_logging(
     
     # Create logger
     logger = logging.getLogger('hybridRAG')
-    logger.setLevel(getattr(logging, level.upper()))
-    
-    # Clear existing handlers
-    logger.handlers.clear()
     
     # Create formatter
     if log_format is None:
         log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     
+    config = (level, log_file, log_format)
+    if config == _configured_with and not force:
+        return logger
+    
+    level_value = getattr(logging, level.upper())
+    logger.setLevel(level_value)
+    
+    # Clear existing handlers
+    logger.handlers.clear()
+    
     formatter = logging.Formatter(log_format)
     
     # Create console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, level.upper()))
+    console_handler.setLevel(level_value)
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
     
     # Create file handler if log_file is specified
     if log_file:
-        # Ensure log directory exists
-        log_path = Path(log_file)
-        log_path.parent.mkdir(parents=True, exist_ok=True)
+        # Ensure log directory exists (once per file)
+        if log_file != _last_log_file:
+            Path(log_file).parent.mkdir(parents=True, exist_ok=True)
         
         file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(getattr(logging, level.upper()))
+        file_handler.setLevel(level_value)
         file_handler.setFormatter(formatter)
         logger.addHandler(file_handler)
     
+    _configured_with = config
+    _last_log_file = log_file
     return logger
 
 def get_logger(name: str = None) -> logging.Logger:
@@ -57,21 +75,38 @@ def get_logger(name: str = None) -> logging.Logger:
         return logging.getLogger(f'hybridRAG.{name}')
     return logging.getLogger('hybridRAG')
 
+class _Params:
+    """Formats keyword arguments as `k=v, ...` only when a handler emits the record."""
+    
+    __slots__ = ('kwargs',)
+    
+    def __init__(self, kwargs: dict):
+        self.kwargs = kwargs
+    
+    def __str__(self) -> str:
+        return ', '.join(f"{k}={v}" for k, v in self.kwargs.items())
+
 def log_function_call(logger: logging.Logger, func_name: str, **kwargs):
     """Log function call with parameters."""
-    params = ', '.join([f"{k}={v}" for k, v in kwargs.items()])
-    logger.debug(f"Calling {func_name}({params})")
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("Calling %s(%s)", func_name, _Params(kwargs))
 
 def log_function_result(logger: logging.Logger, func_name: str, result, **kwargs):
     """Log function result."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    
     if isinstance(result, (list, tuple)):
         result_summary = f"{type(result).__name__} with {len(result)} items"
     elif isinstance(result, dict):
         result_summary = f"{type(result).__name__} with {len(result)} keys"
     else:
-        result_summary = str(result)[:100] + "..." if len(str(result)) > 100 else str(result)
+        result_summary = str(result)
+        if len(result_summary) > 100:
+            result_summary = result_summary[:100] + "..."
     
-    logger.debug(f"{func_name} returned: {result_summary}")
+    logger.debug("%s returned: %s", func_name, result_summary)
 
 def log_error(logger: logging.Logger, error: Exception, context: str = ""):
     """Log error with context."""
@@ -79,8 +114,9 @@ def log_error(logger: logging.Logger, error: Exception, context: str = ""):
 
 def log_performance(logger: logging.Logger, operation: str, duration: float, **kwargs):
     """Log performance metrics."""
-    extra_info = ', '.join([f"{k}={v}" for k, v in kwargs.items()])
-    logger.info(f"Performance: {operation} took {duration:.3f}s {extra_info}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("Performance: %s took %.3fs %s", operation, duration, _Params(kwargs))
 
 # Default logger instance
 logger = get_logger()
@@ -0,0 +1,12 @@
+"""
+Helpers shared by the run_*.py demo scripts.
+"""
+
+from embeddings.generator import get_embedding_generator
+
+def warm(queries):
+    """Embed queries up front and persist them when embedding_cache_path is set."""
+    embedding_gen = get_embedding_generator()
+    embedding_gen.generate_embeddings(list(queries))
+    embedding_gen.save_cache()
+    print(f"Warmed {len(queries)} query embeddings")
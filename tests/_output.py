@@ -0,0 +1,70 @@
+"""
+Buffered console output for the demo scripts and mock tests.
+
+Each print is a write (and, on a TTY or pipe, often a syscall). Wrapping a
+block of prints in buffered_output() collects them in memory and writes the
+whole block to stdout at once. run_captured() does the same per thread, so
+concurrently running tests don't interleave their output.
+"""
+
+import contextlib
+import io
+import sys
+import threading
+
+@contextlib.contextmanager
+def buffered_output():
+    """Collect everything printed inside the block and write it to stdout in one call."""
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            yield buffer
+    finally:
+        # Written even if the block raised, so partial output is not lost
+        sys.stdout.write(buffer.getvalue())
+        sys.stdout.flush()
+
+class _ThreadRoutedStdout:
+    """sys.stdout stand-in that sends each thread's writes to that thread's capture buffer, if any."""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def _target(self):
+        buffer = getattr(self._local, 'buffer', None)
+        return self._stream if buffer is None else buffer
+    
+    def write(self, text):
+        return self._target().write(text)
+    
+    def flush(self):
+        self._target().flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+@contextlib.contextmanager
+def thread_routed_stdout():
+    """Install a stdout that lets run_captured() capture per thread (redirect_stdout is process-wide)."""
+    router = _ThreadRoutedStdout(sys.stdout)
+    sys.stdout = router
+    try:
+        yield router
+    finally:
+        sys.stdout = router._stream
+
+def run_captured(func, *args, **kwargs):
+    """Call func and return (result, exception, printed text) for this thread only.
+    
+    Needs thread_routed_stdout() to be active; exceptions are returned, not raised.
+    """
+    router = sys.stdout
+    buffer = io.StringIO()
+    router._local.buffer = buffer
+    try:
+        return func(*args, **kwargs), None, buffer.getvalue()
+    except Exception as e:
+        return None, e, buffer.getvalue()
+    finally:
+        router._local.buffer = None
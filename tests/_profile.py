@@ -0,0 +1,31 @@
+"""
+Optional cProfile wrapper for the run_*.py scripts.
+
+    python tests/run_demo_retriever.py --profile demo.prof
+    python tests/bench_demo.py demo.prof
+"""
+
+import argparse
+import cProfile
+
+def add_profile_argument(parser: argparse.ArgumentParser):
+    """Add the --profile PATH option."""
+    parser.add_argument(
+        "--profile", metavar="PATH",
+        help="profile the run with cProfile and write the stats to PATH"
+    )
+
+def run_profiled(func, path: str = None):
+    """Call func, profiling it into path when one is given."""
+    if path is None:
+        return func()
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        # Scripts exit with sys.exit on errors; keep the stats anyway
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}")
@@ -0,0 +1,20 @@
+"""
+Print the most expensive functions from a stats file written with --profile.
+"""
+
+import argparse
+import pstats
+
+def main():
+    """Load a cProfile stats file and print the top functions."""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("path", help="stats file written by a run_*.py script with --profile")
+    parser.add_argument("--limit", type=int, default=20, help="number of functions to show")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (cumulative, tottime, ncalls, ...)")
+    args = parser.parse_args()
+    
+    stats = pstats.Stats(args.path)
+    stats.strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+
+if __name__ == "__main__":
+    main()
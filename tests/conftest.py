@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make the src packages importable when the project is not installed (pip install -e .)
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
@@ -1,22 +1,22 @@
-import os
+import argparse
+import asyncio
+import functools
 import sys
-from pathlib import Path
-
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from _profile import add_profile_argument, run_profiled
 from llm.pipeline import LLMPipeline
-from config.settings import get_settings
 
-def main():
+async def compare_strategies(pipeline, query, strategies):
+    """Process the same query with each strategy concurrently."""
+    tasks = [pipeline.aprocess_query(query, strategy=strategy, top_k=2) for strategy in strategies]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+def main(use_cache: bool = True):
     """Main function to demonstrate complete hybridRAG capabilities."""
     try:
-        settings = get_settings()
-        pipeline = LLMPipeline(
-            uri=settings.neo4j_uri,
-            user=settings.neo4j_user,
-            password=settings.neo4j_password
-        )
+        # Shared pipeline; closed at exit
+        pipeline = LLMPipeline.get_shared()
+        pipeline.use_cache = use_cache
         
         print("Complete HybridRAG System Demo")
         print("=" * 60)
@@ -40,9 +40,13 @@ def main():
         strategies = ["vector", "fulltext", "semantic", "hybrid"]
         query = "metformin asthma management"
         
-        for strategy in strategies:
-            result = pipeline.process_query(query, strategy=strategy, top_k=2)
-            if 'error' not in result:
+        # The strategies are independent, so run them concurrently
+        results = asyncio.run(compare_strategies(pipeline, query, strategies))
+        
+        for strategy, result in zip(strategies, results):
+            if isinstance(result, Exception):
+                print(f"{strategy.upper()}: {result}")
+            elif 'error' not in result:
                 print(f"{strategy.upper()}: {result['retrieved_documents']} docs, {result['context_length']} chars")
             else:
                 print(f"{strategy.upper()}: {result['error']}")
@@ -111,9 +115,11 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
-    finally:
-        if 'pipeline' in locals():
-            pipeline.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Demonstrate the complete hybridRAG system.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore cached answers and regenerate every response")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    run_profiled(functools.partial(main, use_cache=not args.no_cache), args.profile)
@@ -1,56 +1,52 @@
-import os
+import argparse
+import functools
 import sys
-from pathlib import Path
-
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from _demo import warm
+from _output import buffered_output
+from _profile import add_profile_argument, run_profiled
 from llm.pipeline import LLMPipeline
-from config.settings import get_settings
 
-def main():
+# Example queries
+QUERIES = (
+    "What is machine learning?",
+    "Explain neural networks",
+    "How does deep learning work?",
+    "What are the benefits of calcium channel blockers?",
+    "How does metformin work?",
+)
+
+def main(use_cache: bool = True):
     """Main function to run demo queries through the complete pipeline."""
     try:
-        settings = get_settings()
-        pipeline = LLMPipeline(
-            uri=settings.neo4j_uri,
-            user=settings.neo4j_user,
-            password=settings.neo4j_password
-        )
-        
-        # Example queries
-        queries = [
-            "What is machine learning?",
-            "Explain neural networks",
-            "How does deep learning work?",
-            "What are the benefits of calcium channel blockers?",
-            "How does metformin work?"
-        ]
+        # Shared pipeline; closed at exit
+        pipeline = LLMPipeline.get_shared()
+        pipeline.use_cache = use_cache
         
         print("Running hybridRAG pipeline demo...")
         print("=" * 50)
         
-        for i, query in enumerate(queries, 1):
-            print(f"\nQuery {i}: {query}")
-            print("-" * 30)
-            
-            # Process query through the complete pipeline
-            result = pipeline.process_query(query, strategy="hybrid", top_k=3, include_explanation=True)
-            
-            if 'error' in result:
-                print(f"Error: {result['error']}")
-            else:
-                print(f"Retrieved {result['retrieved_documents']} documents")
-                print(f"Context length: {result['context_length']} characters")
-                print(f"\nResponse:\n{result['response']}")
+        # Process all queries through the complete pipeline in one batch
+        results = pipeline.process_queries(QUERIES, strategy="hybrid", top_k=3, include_explanation=True)
+        
+        for i, (query, result) in enumerate(zip(QUERIES, results), 1):
+            # One write per query
+            with buffered_output():
+                print(f"\nQuery {i}: {query}")
+                print("-" * 30)
                 
-                # Show explanation if available
-                if 'explanation' in result:
-                    explanation = result['explanation']
-                    print(f"\nRetrieval Strategy Weights:")
-                    print(f"  Vector: {explanation['strategy_weights']['vector']:.2f}")
-                    print(f"  Fulltext: {explanation['strategy_weights']['fulltext']:.2f}")
-                    print(f"  Semantic: {explanation['strategy_weights']['semantic']:.2f}")
+                if 'error' in result:
+                    print(f"Error: {result['error']}")
+                else:
+                    print(f"Retrieved {result['retrieved_documents']} documents")
+                    print(f"Context length: {result['context_length']} characters")
+                    print(f"\nResponse:\n{result['response']}")
+                    
+                    # Show explanation if available
+                    if 'explanation' in result:
+                        weights = result['explanation']['strategy_weights']
+                        print(f"\nRetrieval Strategy Weights (vector/fulltext/semantic): "
+                              f"{weights['vector']:.2f}/{weights['fulltext']:.2f}/{weights['semantic']:.2f}")
         
         # Show pipeline statistics
         print("\n" + "=" * 50)
@@ -65,9 +61,15 @@ def main():
     except Exception as e:
         print(f"Error during demo: {e}")
         sys.exit(1)
-    finally:
-        if 'pipeline' in locals():
-            pipeline.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run demo queries through the complete pipeline.")
+    parser.add_argument("--warm", action="store_true",
+                        help="embed the demo queries before running (persisted if embedding_cache_path is set)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore cached answers and regenerate every response")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.warm:
+        warm(QUERIES)
+    run_profiled(functools.partial(main, use_cache=not args.no_cache), args.profile)
@@ -1,9 +1,7 @@
+import argparse
 import sys
-from pathlib import Path
-
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from _profile import add_profile_argument, run_profiled
 from db.ingestion import Neo4jIngestor
 from config.settings import get_settings
 
@@ -28,4 +26,7 @@ def main():
             ingestor.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Load the dataset into Neo4j.")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    run_profiled(main, args.profile)
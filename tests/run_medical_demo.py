@@ -1,63 +1,59 @@
-import os
+import argparse
+import functools
 import sys
-from pathlib import Path
-
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from _demo import warm
+from _profile import add_profile_argument, run_profiled
+from _output import buffered_output
 from llm.pipeline import LLMPipeline
-from config.settings import get_settings
 
-def main():
+# Medical queries that should match the dataset content
+QUERIES = (
+    "What are calcium channel blockers?",
+    "How do calcium channel blockers affect Type 2 Diabetes?",
+    "What is metformin used for?",
+    "How does metformin help with asthma?",
+    "What are statins?",
+    "How do statins help with hypertension?",
+)
+
+def main(use_cache: bool = True):
     """Main function to run medical-focused demo queries."""
     try:
-        settings = get_settings()
-        pipeline = LLMPipeline(
-            uri=settings.neo4j_uri,
-            user=settings.neo4j_user,
-            password=settings.neo4j_password
-        )
-        
-        # Medical queries that should match the dataset content
-        queries = [
-            "What are calcium channel blockers?",
-            "How do calcium channel blockers affect Type 2 Diabetes?",
-            "What is metformin used for?",
-            "How does metformin help with asthma?",
-            "What are statins?",
-            "How do statins help with hypertension?"
-        ]
+        # Shared pipeline; closed at exit
+        pipeline = LLMPipeline.get_shared()
+        pipeline.use_cache = use_cache
         
         print("Medical HybridRAG Demo")
         print("=" * 50)
         print("Testing queries relevant to the medical dataset...")
         print("=" * 50)
         
-        for i, query in enumerate(queries, 1):
-            print(f"\nQuery {i}: {query}")
-            print("-" * 30)
-            
-            # Process query through the complete pipeline
-            result = pipeline.process_query(query, strategy="hybrid", top_k=3, include_explanation=True)
-            
-            if 'error' in result:
-                print(f"Error: {result['error']}")
-            else:
-                print(f"Retrieved {result['retrieved_documents']} documents")
-                print(f"Context length: {result['context_length']} characters")
+        # Process all queries through the complete pipeline in one batch
+        results = pipeline.process_queries(QUERIES, strategy="hybrid", top_k=3, include_explanation=True)
+        
+        for i, (query, result) in enumerate(zip(QUERIES, results), 1):
+            # One write per query
+            with buffered_output():
+                print(f"\nQuery {i}: {query}")
+                print("-" * 30)
                 
-                if result['retrieved_documents'] > 0:
-                    print(f"\nResponse:\n{result['response']}")
+                if 'error' in result:
+                    print(f"Error: {result['error']}")
                 else:
-                    print("No relevant documents found.")
-                
-                # Show explanation if available
-                if 'explanation' in result:
-                    explanation = result['explanation']
-                    print(f"\nRetrieval Strategy Weights:")
-                    print(f"  Vector: {explanation['strategy_weights']['vector']:.2f}")
-                    print(f"  Fulltext: {explanation['strategy_weights']['fulltext']:.2f}")
-                    print(f"  Semantic: {explanation['strategy_weights']['semantic']:.2f}")
+                    print(f"Retrieved {result['retrieved_documents']} documents")
+                    print(f"Context length: {result['context_length']} characters")
+                    
+                    if result['retrieved_documents'] > 0:
+                        print(f"\nResponse:\n{result['response']}")
+                    else:
+                        print("No relevant documents found.")
+                    
+                    # Show explanation if available
+                    if 'explanation' in result:
+                        weights = result['explanation']['strategy_weights']
+                        print(f"\nRetrieval Strategy Weights (vector/fulltext/semantic): "
+                              f"{weights['vector']:.2f}/{weights['fulltext']:.2f}/{weights['semantic']:.2f}")
         
         # Show pipeline statistics
         print("\n" + "=" * 50)
@@ -68,13 +64,21 @@ def main():
         print(f"  Temperature: {stats['temperature']}")
         print(f"  Max tokens: {stats['max_tokens']}")
         print(f"  Retriever weights: {stats['retriever_weights']}")
+        cache = pipeline.cache_stats()
+        print(f"  Response cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%} hit rate)")
         
     except Exception as e:
         print(f"Error during medical demo: {e}")
         sys.exit(1)
-    finally:
-        if 'pipeline' in locals():
-            pipeline.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run medical-focused demo queries.")
+    parser.add_argument("--warm", action="store_true",
+                        help="embed the demo queries before running (persisted if embedding_cache_path is set)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore cached answers and regenerate every response")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.warm:
+        warm(QUERIES)
+    run_profiled(functools.partial(main, use_cache=not args.no_cache), args.profile)
@@ -0,0 +1,89 @@
+"""
+CandidateIndex search at each storage dtype, checked against brute-force cosine
+"""
+
+import numpy as np
+import pytest
+
+from embeddings.utils import CandidateIndex, find_similar_embeddings
+
+# Allowed error of a reported similarity per storage dtype
+TOLERANCE = {"float32": 1e-5, "float16": 5e-3, "int8": 2e-2}
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(7)
+    candidates = rng.standard_normal((300, 64)).astype(np.float32)
+    # Rows at different scales, so results depend on normalization
+    candidates *= rng.uniform(0.1, 10.0, size=(300, 1)).astype(np.float32)
+    candidates[42] = 0.0
+    # Near-duplicate of row 17, so the best match is unambiguous at every dtype
+    query = candidates[17] / np.linalg.norm(candidates[17]) + 0.05 * rng.standard_normal(64).astype(np.float32)
+    return candidates, query
+
+def _brute_force(candidates, query):
+    norms = np.linalg.norm(candidates, axis=1)
+    dots = candidates.astype(np.float64) @ query.astype(np.float64)
+    return np.where(norms == 0, 0.0, dots / (np.where(norms == 0, 1.0, norms) * np.linalg.norm(query)))
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_find_similar_matches_brute_force(data, dtype):
+    candidates, query = data
+    exact = _brute_force(candidates, query)
+    tolerance = TOLERANCE[dtype]
+
+    index = CandidateIndex.from_embeddings(candidates.tolist(), dtype=dtype)
+    assert len(index) == len(candidates)
+    assert index.matrix.dtype == np.dtype(dtype)
+    np.testing.assert_allclose(index.norms, np.linalg.norm(candidates, axis=1), rtol=1e-6)
+
+    results = index.find_similar(query.tolist(), top_k=10)
+    assert len(results) == 10
+    assert results[0][0] == 17
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+    kth_best = np.sort(exact)[-10]
+    for i, score in results:
+        assert score == pytest.approx(exact[i], abs=tolerance)
+        # Quantization may swap near-ties, never pull in a clearly worse candidate
+        assert exact[i] >= kth_best - 2 * tolerance
+
+def test_float32_index_agrees_with_find_similar_embeddings(data):
+    candidates, query = data
+    index = CandidateIndex.from_embeddings(candidates.tolist())
+    indexed = index.find_similar(query.tolist(), top_k=20)
+    direct = find_similar_embeddings(query.tolist(), candidates.tolist(), top_k=20)
+    assert [i for i, _ in indexed] == [i for i, _ in direct]
+
+def test_threshold_zero_rows_and_empty_index(data):
+    candidates, query = data
+    index = CandidateIndex.from_embeddings(candidates.tolist(), dtype="float16")
+
+    exact = _brute_force(candidates, query)
+    tolerance = TOLERANCE["float16"]
+    found = {i for i, _ in index.find_similar(query.tolist(), top_k=len(candidates), threshold=0.2)}
+    assert set(np.flatnonzero(exact >= 0.2 + tolerance)) <= found
+    assert all(exact[i] >= 0.2 - tolerance for i in found)
+    assert 42 not in found
+
+    assert index.find_similar(np.zeros(64).tolist(), top_k=3, threshold=0.5) == []
+    assert CandidateIndex.from_embeddings([]).find_similar(query.tolist()) == []
+    with pytest.raises(ValueError):
+        CandidateIndex.from_embeddings(candidates.tolist(), dtype="float64")
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_chunked_scoring_without_simsimd(data, dtype, monkeypatch):
+    import embeddings.utils as utils_module
+
+    candidates, query = data
+    index = CandidateIndex.from_embeddings(candidates.tolist(), dtype=dtype)
+    expected = index.find_similar(query.tolist(), top_k=10)
+
+    monkeypatch.setattr(utils_module, "simsimd", None)
+    # Chunks that do not divide the row count
+    monkeypatch.setattr(CandidateIndex, "SCORE_CHUNK", 7)
+    results = index.find_similar(query.tolist(), top_k=10)
+    assert [i for i, _ in results][:3] == [i for i, _ in expected][:3]
+    for (_, score), (_, expected_score) in zip(results, expected):
+        assert score == pytest.approx(expected_score, abs=TOLERANCE[dtype])
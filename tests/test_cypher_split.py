@@ -0,0 +1,48 @@
+"""
+Statement splitting for the db/*.cypher scripts (no Neo4j needed)
+"""
+
+import os
+
+from db.ingestion import split_cypher_statements
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_plain_statements():
+    script = "CREATE (a:A);\nCREATE (b:B);\n\n"
+    assert split_cypher_statements(script) == ["CREATE (a:A)", "CREATE (b:B)"]
+
+def test_semicolons_inside_strings():
+    script = (
+        "CREATE (d:Document {text: 'a; b'});\n"
+        'CREATE (d:Document {text: "c; \\"d;\\" e"});\n'
+        "CREATE (d:Document {text: 'it\\'s; fine'})"
+    )
+    assert split_cypher_statements(script) == [
+        "CREATE (d:Document {text: 'a; b'})",
+        'CREATE (d:Document {text: "c; \\"d;\\" e"})',
+        "CREATE (d:Document {text: 'it\\'s; fine'})",
+    ]
+
+def test_backticks_and_comments():
+    script = (
+        "// header; not a statement\n"
+        "MATCH (n:`odd;label`) RETURN n; /* block; comment */\n"
+        "MATCH (m) // trailing; comment\n"
+        "RETURN m;"
+    )
+    statements = split_cypher_statements(script)
+    assert len(statements) == 2
+    assert statements[0] == "MATCH (n:`odd;label`) RETURN n"
+    assert statements[1].split() == ["MATCH", "(m)", "RETURN", "m"]
+
+def test_unterminated_last_statement():
+    assert split_cypher_statements("RETURN 1;\nRETURN 2") == ["RETURN 1", "RETURN 2"]
+    assert split_cypher_statements("  ;\n// only a comment\n") == []
+
+def test_repo_scripts_split():
+    for script in ("create_indexes.cypher", "drop_indexes.cypher"):
+        with open(os.path.join(ROOT, "db", script)) as f:
+            statements = split_cypher_statements(f.read())
+        assert statements, script
+        assert all(";" not in statement for statement in statements), script
@@ -0,0 +1,87 @@
+"""
+EmbeddingGenerator's embedding cache, with a fake OpenAI client
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import embeddings.generator as generator_module
+from config.settings import get_settings
+from embeddings.generator import EmbeddingGenerator
+
+class FakeEmbeddingsAPI:
+    """Stands in for client.embeddings; records every requested input."""
+
+    def __init__(self):
+        self.requests = []
+        self.fail = False
+
+    def create(self, input, model):
+        self.requests.append(input)
+        if self.fail:
+            raise RuntimeError("API unavailable")
+        texts = [input] if isinstance(input, str) else input
+        # Reversed, to check that results are matched back by index
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), float(i), 1.0])
+                for i, text in enumerate(texts)]
+        return SimpleNamespace(data=data[::-1] if len(data) > 1 else data)
+
+@pytest.fixture
+def generator(monkeypatch):
+    settings = get_settings().model_copy(update={
+        "openai_api_key": None, "embedding_cache_path": None, "embedding_batch_size": 2,
+    })
+    monkeypatch.setattr(generator_module, "get_settings", lambda: settings)
+    generator = EmbeddingGenerator()
+    generator.client = SimpleNamespace(embeddings=FakeEmbeddingsAPI())
+    return generator
+
+def test_single_embedding_hit_and_miss(generator):
+    api = generator.client.embeddings
+    first = generator.generate_embedding("metformin")
+    assert first == [9.0, 0.0, 1.0]
+    assert generator.generate_embedding("metformin") == first
+    assert api.requests == ["metformin"]
+
+    # Callers get copies, so mutating a result cannot corrupt the cache
+    first.append(99.0)
+    assert generator.generate_embedding("metformin") == [9.0, 0.0, 1.0]
+
+    generator.generate_embedding("insulin")
+    assert api.requests == ["metformin", "insulin"]
+
+def test_batch_requests_only_uncached_texts(generator):
+    api = generator.client.embeddings
+    generator.generate_embedding("a")
+
+    texts = ["a", "bb", "ccc", "bb", "dddd"]
+    embeddings = generator.generate_embeddings(texts)
+    assert [embedding[0] for embedding in embeddings] == [1.0, 2.0, 3.0, 2.0, 4.0]
+    # One request per batch of distinct uncached texts (batch size 2)
+    assert api.requests == ["a", ["bb", "ccc"], ["dddd"]]
+
+    assert generator.generate_embeddings(texts) == embeddings
+    assert len(api.requests) == 3
+
+def test_fallback_vectors_are_not_cached(generator):
+    api = generator.client.embeddings
+    api.fail = True
+    fallback = generator.generate_embedding("aspirin")
+    batch_fallback = generator.generate_embeddings(["ibuprofen"])[0]
+    assert len(fallback) == 1536 and len(batch_fallback) == 1536
+    assert len(generator._cache) == 0
+
+    # Once the API is back, the real embeddings are fetched
+    api.fail = False
+    assert generator.generate_embedding("aspirin") == [7.0, 0.0, 1.0]
+    assert generator.generate_embeddings(["ibuprofen"])[0] == [9.0, 0.0, 1.0]
+    assert api.requests == ["aspirin", ["ibuprofen"], "aspirin", ["ibuprofen"]]
+
+def test_fallback_embeddings_are_reproducible(generator):
+    import hashlib
+
+    # Pinned to blake2b, so every process and environment gets the same vector
+    digest = hashlib.blake2b(b"aspirin", digest_size=4).digest()
+    assert generator_module._stable_seed("aspirin") == int.from_bytes(digest, "little")
+    assert generator._generate_random_embedding("aspirin") == generator._generate_random_embedding("aspirin")
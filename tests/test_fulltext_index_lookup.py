@@ -0,0 +1,93 @@
+"""
+Fulltext index coverage lookups in Neo4jFulltextRetriever (fake driver, no Neo4j needed)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from cachetools import TTLCache
+
+from retrieval.neo4j_fulltext_retriever import TEXT_INDEX_NAME, Neo4jFulltextRetriever
+
+class FakeDriver:
+    """Answers SHOW FULLTEXT INDEXES from a dict of index name -> properties."""
+
+    def __init__(self):
+        self.indexes = {}
+        self.lookups = 0
+        self.fail = False
+
+    def session(self, database=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def run(self, query, index_name):
+        self.lookups += 1
+        if self.fail:
+            raise RuntimeError("connection reset")
+        properties = self.indexes.get(index_name)
+        return SimpleNamespace(single=lambda: {"properties": properties} if properties is not None else None)
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+@pytest.fixture
+def retriever(clock):
+    retriever = Neo4jFulltextRetriever(driver=FakeDriver())
+    retriever._missing_indexes = TTLCache(maxsize=32, ttl=retriever.INDEX_RECHECK_INTERVAL,
+                                          timer=lambda: clock[0])
+    return retriever
+
+def test_existing_index_is_looked_up_once(retriever):
+    driver = retriever.driver
+    driver.indexes[TEXT_INDEX_NAME] = ["text"]
+    assert retriever._index_covers(TEXT_INDEX_NAME, "text")
+    assert not retriever._index_covers(TEXT_INDEX_NAME, "title")
+    assert driver.lookups == 1
+
+def test_missing_index_is_rechecked(retriever, clock):
+    driver = retriever.driver
+    assert not retriever._index_covers(TEXT_INDEX_NAME, "text")
+    assert not retriever._index_covers(TEXT_INDEX_NAME, "text")
+    assert driver.lookups == 1
+
+    # Created by another process, e.g. run_ingest.py
+    driver.indexes[TEXT_INDEX_NAME] = ["text"]
+    clock[0] += retriever.INDEX_RECHECK_INTERVAL + 1
+    assert retriever._index_covers(TEXT_INDEX_NAME, "text")
+    assert driver.lookups == 2
+
+def test_failed_lookup_is_not_cached(retriever, caplog):
+    driver = retriever.driver
+    driver.indexes[TEXT_INDEX_NAME] = ["text"]
+    driver.fail = True
+    assert not retriever._index_covers(TEXT_INDEX_NAME, "text")
+    assert "scanning instead" in caplog.text
+
+    driver.fail = False
+    assert retriever._index_covers(TEXT_INDEX_NAME, "text")
+    assert driver.lookups == 2
+
+def test_create_index_validates_name_and_passes_parameters(retriever):
+    from retrieval._cypher import check_index_name
+
+    for name in ("documentFulltextIndex", TEXT_INDEX_NAME, "idx_2"):
+        check_index_name(name)
+    for name in ("x') YIELD name //", "", "2index", "doc-index", None):
+        with pytest.raises(ValueError):
+            check_index_name(name)
+
+    calls = []
+    retriever.driver.run = lambda query, **parameters: calls.append((query, parameters))
+    with pytest.raises(ValueError):
+        retriever.create_fulltext_index("bad'name", "Document", ["text"])
+    retriever.create_fulltext_index(TEXT_INDEX_NAME, "Document", ["text"])
+    query, parameters = calls[0]
+    assert TEXT_INDEX_NAME not in query
+    assert parameters == {"index_name": TEXT_INDEX_NAME, "label": "Document", "properties": ["text"]}
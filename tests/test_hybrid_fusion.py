@@ -0,0 +1,75 @@
+"""
+Reciprocal Rank Fusion in HybridRetriever._combine_and_rerank (no Neo4j needed)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from retrieval.hybrid_retriever import HybridRetriever
+
+def _node(node_id):
+    return SimpleNamespace(id=node_id)
+
+def _ranked(*ids):
+    """Result list in rank order; the raw scores are deliberately on unrelated scales."""
+    return [(_node(node_id), 1000.0 - rank) for rank, node_id in enumerate(ids)]
+
+@pytest.fixture
+def retriever():
+    """Retriever with only the fusion settings; no driver or embedder."""
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    retriever.vector_weight = 0.4
+    retriever.fulltext_weight = 0.3
+    retriever.semantic_weight = 0.3
+    retriever.rrf_k = 60
+    return retriever
+
+def _reference(retriever, lists, top_k):
+    """Straightforward weighted RRF, counting only a document's best rank per list."""
+    weights = (retriever.vector_weight, retriever.fulltext_weight, retriever.semantic_weight)
+    scores = {}
+    for results, weight in zip(lists, weights):
+        seen = set()
+        for rank, (node, _score) in enumerate(results, 1):
+            if node.id in seen:
+                continue
+            seen.add(node.id)
+            scores[node.id] = scores.get(node.id, 0.0) + weight / (retriever.rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+
+def test_rrf_matches_reference(retriever):
+    lists = (_ranked(1, 2, 3, 4), _ranked(3, 1, 5), _ranked(5, 3, 2, 2))
+    results, breakdown = retriever._combine_and_rerank(*lists, top_k=5)
+
+    expected = _reference(retriever, lists, 5)
+    assert [node.id for node, _ in results] == [node_id for node_id, _ in expected]
+    for (_, score), (_, expected_score) in zip(results, expected):
+        assert score == pytest.approx(expected_score)
+
+    # Contributions are per strategy and add up to the fused score
+    assert set(breakdown) == {node.id for node, _ in results}
+    for node, score in results:
+        parts = breakdown[node.id]
+        assert set(parts) == {"vector", "fulltext", "semantic"}
+        assert sum(parts.values()) == pytest.approx(score)
+    assert breakdown[4]["fulltext"] == 0.0 and breakdown[4]["semantic"] == 0.0
+    assert breakdown[1]["vector"] == pytest.approx(0.4 / 61)
+
+def test_rrf_ties_keep_first_seen_order(retriever):
+    retriever.vector_weight = retriever.fulltext_weight = retriever.semantic_weight = 1.0
+    # 7 and 8 both sit at ranks 1 and 2 of one list each, so their scores are equal
+    results, _ = retriever._combine_and_rerank(_ranked(7, 8), _ranked(8, 7), [], top_k=2)
+    assert [node.id for node, _ in results] == [7, 8]
+    assert results[0][1] == results[1][1]
+
+    results, _ = retriever._combine_and_rerank(_ranked(8, 7), _ranked(7, 8), [], top_k=2)
+    assert [node.id for node, _ in results] == [8, 7]
+
+def test_rrf_top_k_and_empty_input(retriever):
+    lists = (_ranked(*range(10)), _ranked(*range(9, -1, -1)), [])
+    results, breakdown = retriever._combine_and_rerank(*lists, top_k=3)
+    assert len(results) == 3 and len(breakdown) == 3
+
+    assert retriever._combine_and_rerank([], [], [], top_k=5) == ([], {})
+    assert retriever._combine_and_rerank(*lists, top_k=0) == ([], {})
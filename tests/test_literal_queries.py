@@ -0,0 +1,95 @@
+"""
+Literal-lookup routing in HybridRetriever (fake searches, no Neo4j needed)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from cachetools import TTLCache
+
+from retrieval.hybrid_retriever import HybridRetriever, _is_literal, _lucene_literal
+from retrieval.neo4j_fulltext_retriever import TEXT_INDEX_NAME
+
+class FakeSearches:
+    """Stands in for both sub-retrievers and records (search, index, query) calls."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.generation = 0
+
+    def _record(self, *call):
+        with self.lock:
+            self.calls.append(call)
+
+    def fulltext_search(self, query, index_name, top_k=5):
+        self._record("fulltext", index_name, query)
+        return [(SimpleNamespace(id=hash((index_name, query)) % 1000), 1.0)]
+
+    def fulltext_search_batch(self, queries, index_name, top_k=5):
+        return [self.fulltext_search(query, index_name, top_k) for query in queries]
+
+    def semantic_search(self, query, label, property, top_k=5):
+        self._record("semantic", property, query)
+        return []
+
+    def semantic_search_batch(self, queries, label, property, top_k=5):
+        return [self.semantic_search(query, label, property, top_k) for query in queries]
+
+    def vector_search(self, query, top_k=5, query_vector=None):
+        self._record("vector", None, query)
+        return []
+
+    def vector_search_batch(self, queries, top_k=5):
+        return [self.vector_search(query, top_k) for query in queries]
+
+@pytest.fixture
+def retriever():
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    retriever.vector_weight = retriever.fulltext_weight = retriever.semantic_weight = 1 / 3
+    retriever.rrf_k = 60
+    retriever.literal_shortcircuit = True
+    retriever.vector_store = retriever.fulltext_retriever = FakeSearches()
+    retriever._pool = ThreadPoolExecutor(max_workers=4)
+    retriever._cache = TTLCache(maxsize=64, ttl=60)
+    retriever._cache_lock = threading.Lock()
+    yield retriever
+    retriever._pool.shutdown()
+
+def test_literal_detection():
+    for query in ("HbA1c", "ACE-2", "doc_42", "v1.2", '"insulin resistance"'):
+        assert _is_literal(query), query
+    for query in ("diabetes", "Diabetes", "insulin resistance", "doc:42", "title:insulin"):
+        assert not _is_literal(query), query
+
+def test_lucene_escaping():
+    assert _lucene_literal("ACE-2") == r"ACE\-2"
+    assert _lucene_literal(" HbA1c ") == "HbA1c"
+    assert _lucene_literal('"insulin resistance"') == '"insulin resistance"'
+
+def test_literal_searches_both_fulltext_indexes(retriever):
+    retriever.retrieve("ACE-2", top_k=3)
+    assert sorted(retriever.fulltext_retriever.calls) == [
+        ("fulltext", "documentFulltextIndex", r"ACE\-2"),
+        ("fulltext", TEXT_INDEX_NAME, r"ACE\-2"),
+    ]
+
+    explanation = retriever.explain_retrieval("ACE-2", top_k=3)
+    assert explanation["literal_shortcircuit"] is True
+    assert explanation["vector_results"] == []
+    assert explanation["semantic_results"]
+
+def test_batch_routes_literals_like_single_queries(retriever):
+    retriever.retrieve_batch(["HbA1c", "diabetes"], top_k=3)
+    calls = retriever.fulltext_retriever.calls
+    assert ("fulltext", TEXT_INDEX_NAME, "HbA1c") in calls
+    assert ("fulltext", "documentFulltextIndex", "HbA1c") in calls
+    assert ("fulltext", "documentFulltextIndex", "diabetes") in calls
+    assert {query for kind, _, query in calls if kind in ("vector", "semantic")} == {"diabetes"}
+
+def test_shortcircuit_off_runs_every_strategy(retriever):
+    retriever.literal_shortcircuit = False
+    retriever.retrieve("HbA1c", top_k=3)
+    assert sorted(kind for kind, _, _ in retriever.fulltext_retriever.calls) == ["fulltext", "semantic", "vector"]
@@ -0,0 +1,156 @@
+"""
+LLMPipeline's response cache, with a fake retriever and chat client
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import llm.pipeline as pipeline_module
+from config.settings import get_settings
+from llm.pipeline import LLMPipeline
+
+TTL = 60
+
+class FakeRetriever:
+    """Stands in for HybridRetriever; counts retrievals and can be made to fail."""
+
+    def __init__(self, *args, **kwargs):
+        self.vector_weight, self.fulltext_weight, self.semantic_weight = 0.4, 0.3, 0.3
+        self.rrf_k = 60
+        self.vector_store = SimpleNamespace(generation=0)
+        self.calls = 0
+        self.fail = False
+
+    def retrieve(self, query, top_k, strategy):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        return [(SimpleNamespace(text=f"About {query}."), 1.0)]
+
+    def close(self):
+        pass
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("rate limited")
+        message = SimpleNamespace(content=f" answer {self.calls} ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pipeline_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+@pytest.fixture
+def pipeline(monkeypatch, clock):
+    settings = get_settings().model_copy(update={
+        "openai_api_key": None, "response_cache_path": None, "response_cache_ttl": TTL,
+    })
+    monkeypatch.setattr(pipeline_module, "get_settings", lambda: settings)
+    monkeypatch.setattr(pipeline_module, "HybridRetriever", FakeRetriever)
+    monkeypatch.setattr(pipeline_module, "get_embedding_generator",
+                        lambda: SimpleNamespace(model_name="text-embedding-ada-002"))
+    pipeline = LLMPipeline()
+    pipeline.openai_client = SimpleNamespace(api_key="test", chat=SimpleNamespace(completions=FakeCompletions()))
+    return pipeline
+
+def test_hit_returns_a_copy(pipeline):
+    first = pipeline.process_query("metformin")
+    assert first["response"] == "answer 1" and "fallback" not in first
+
+    first["response"] = "changed"
+    assert pipeline.process_query("metformin")["response"] == "answer 1"
+    assert pipeline.retriever.calls == 1
+    assert pipeline.cache_stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1}
+
+    # A different request or setting is a different entry
+    pipeline.process_query("metformin", top_k=3)
+    pipeline.set_pipeline_config(temperature=0.0)
+    pipeline.process_query("metformin")
+    assert pipeline.retriever.calls == 3
+
+    # So is the same request against another database
+    pipeline.database = "other"
+    pipeline.process_query("metformin")
+    assert pipeline.retriever.calls == 4
+
+def test_entries_expire_after_ttl(pipeline, clock):
+    pipeline.process_query("insulin")
+    clock[0] += TTL
+    assert pipeline.process_query("insulin")["response"] == "answer 1"
+
+    clock[0] += 1
+    assert pipeline.process_query("insulin")["response"] == "answer 2"
+    assert pipeline.retriever.calls == 2
+    assert pipeline.cache_stats()["size"] == 1
+
+def test_errors_and_fallbacks_are_not_cached(pipeline):
+    pipeline.retriever.fail = True
+    assert "error" in pipeline.process_query("aspirin")
+    pipeline.retriever.fail = False
+
+    completions = pipeline.openai_client.chat.completions
+    completions.fail = True
+    assert pipeline.process_query("aspirin")["fallback"] is True
+    assert pipeline.cache_stats()["size"] == 0
+
+    completions.fail = False
+    assert pipeline.process_query("aspirin")["response"] == "answer 2"
+    assert pipeline.process_query("aspirin")["response"] == "answer 2"
+    assert pipeline.retriever.calls == 3
+
+def test_use_cache_off_and_clear(pipeline):
+    pipeline.use_cache = False
+    pipeline.process_query("statins")
+    pipeline.process_query("statins")
+    assert pipeline.retriever.calls == 2
+    assert pipeline.cache_stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "size": 0}
+
+    pipeline.use_cache = True
+    pipeline.process_query("statins")
+    pipeline.clear_cache()
+    pipeline.process_query("statins")
+    assert pipeline.retriever.calls == 4
+
+def test_async_client_shared_per_loop_and_closed_at_shutdown(pipeline, monkeypatch):
+    import asyncio
+    import openai
+
+    created, closed = [], []
+
+    class FakeAsyncOpenAI:
+        def __init__(self, **kwargs):
+            created.append(self)
+            completions = FakeCompletions()
+
+            async def create(**kwargs):
+                return completions.create(**kwargs)
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+        async def close(self):
+            closed.append(self)
+
+    monkeypatch.setattr(openai, "AsyncOpenAI", FakeAsyncOpenAI, raising=False)
+    monkeypatch.setattr(pipeline_module, "new_async_http_client", lambda: None)
+    pipeline.use_cache = False
+
+    async def run(queries):
+        results = await asyncio.gather(*(pipeline.aprocess_query(query) for query in queries))
+        assert created[-1] not in closed
+        return results
+
+    results = asyncio.run(run(["a", "b", "c"]))
+    assert all("fallback" not in result for result in results)
+    assert len(created) == 1 and closed == created
+
+    # A new loop gets its own client
+    asyncio.run(run(["d"]))
+    assert len(created) == 2 and closed == created